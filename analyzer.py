@@ -1,4 +1,6 @@
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
+import re
+import json
 import requests
 import time
 import asyncio
@@ -8,101 +10,293 @@ from config import (
     LLM_BASE_URL,
     LLM_MODEL,
     ARTICLE_MAX_CHARS,
-    LLM_CONTEXT_LIMIT,
-    LLM_COMPLETION_LIMIT,
+    LLM_CONTEXT_TOKENS,
+    LLM_COMPLETION_TOKENS,
+    LLM_TOKEN_SAFETY_MARGIN,
     LLM_MAX_TOKENS,
     LLM_TEMPERATURE,
     LLM_THREADPOOL_WORKERS,
     LLM_TIMEOUT,
     LLM_RETRIES,
     LLM_RETRY_BACKOFF,
+    DEDUP_ENABLED,
+    DEDUP_THRESHOLD,
+    LLM_ANALYSIS_MODE,
+    LLM_MAPREDUCE_BATCH_TOKENS,
+    LLM_MAP_MAX_TOKENS,
+    LLM_SUMMARY_BATCH_TOKENS,
+    LLM_SUMMARY_MAX_TOKENS,
+    LLM_SUMMARY_MAX_CHARS,
+    SUMMARY_CACHE_FILE,
+    SUMMARY_CACHE_RETENTION_DAYS,
+    LLM_STREAM,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_TTL,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_FILE,
+    LLM_RATE_LIMIT_RPS,
+    LLM_RATE_LIMIT_BURST,
+    LLM_MAX_RETRY_AFTER,
+    LLM_TRUNCATE_MODE,
+    RANK_HALF_LIFE_HOURS,
+    CHANNEL_WEIGHTS,
 )
+import metrics
+import cpu_backend
+from dedup import dedup_news
+from ranking import parse_channel_weights, score_item, select_items
+from seen_store import item_key
+from tokens import count_tokens, truncate_to_tokens
+from llm_cache import LLMCache
+from summary_cache import SummaryCache, summary_key
+from llm_client import LLMClient
 from logger import get_logger, report_error
 
 logger = get_logger(__name__)
 
-# LLM 上下文限制（字符数估算，大致 prompt + completion 总和）
-# 通过环境变量 LLM_CONTEXT_LIMIT 配置
-ESTIMATED_CONTEXT_LIMIT = LLM_CONTEXT_LIMIT
-ESTIMATED_COMPLETION_LIMIT = LLM_COMPLETION_LIMIT  # 预留给输出的字符数
+# 输出预留 token：不少于实际请求的 max_tokens，否则 prompt + max_tokens 可能超出上下文
+COMPLETION_RESERVE_TOKENS = max(LLM_COMPLETION_TOKENS, LLM_MAX_TOKENS)
 
 # 可复用的线程池执行器（用于异步化同步操作）
 _executor = ThreadPoolExecutor(max_workers=LLM_THREADPOOL_WORKERS)
 
+# 连接池复用的 LLM HTTP 客户端（池大小与线程池并发一致，带客户端限速）
+_llm_client = LLMClient(
+    LLM_BASE_URL,
+    LLM_API_KEY,
+    pool_size=LLM_THREADPOOL_WORKERS,
+    timeout=LLM_TIMEOUT,
+    backoff=LLM_RETRY_BACKOFF,
+    max_retry_after=LLM_MAX_RETRY_AFTER,
+    rate=LLM_RATE_LIMIT_RPS,
+    burst=LLM_RATE_LIMIT_BURST,
+)
+
+# 重要度排序使用的频道权重
+_CHANNEL_WEIGHTS = parse_channel_weights(CHANNEL_WEIGHTS)
+
+# LLM 响应缓存（按 base_url/model/temperature/max_tokens/prompt 哈希）
+_llm_cache = (
+    LLMCache(LLM_CACHE_FILE, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES)
+    if LLM_CACHE_ENABLED
+    else None
+)
+
+# hierarchical 模式的条目摘要缓存（按模型 + 内容哈希）
+_summary_cache = (
+    SummaryCache(SUMMARY_CACHE_FILE, SUMMARY_CACHE_RETENTION_DAYS)
+    if LLM_ANALYSIS_MODE == "hierarchical"
+    else None
+)
+
+# 摘要响应中的一行：【编号】摘要
+_SUMMARY_LINE_RE = re.compile(r"^\s*【(\d+)】\s*(.+?)\s*$", re.MULTILINE)
+
+
+class LLMErrorMessage(str):
+    """LLM 调用失败时返回给用户的提示文本，用于与正常分析结果区分"""
+
+
+def is_llm_error(text) -> bool:
+    """判断分析结果是否为错误提示（错误提示不应被缓存或视为已完成的简报）"""
+    return isinstance(text, LLMErrorMessage)
+
 
-def _truncate_news_items(all_news: List[dict], max_chars: int) -> List[dict]:
+def _item_sources(item: dict) -> List[dict]:
     """
-    裁剪新闻项，确保总字符数不超过 max_chars。
-    尽量保留更多条目，必要时等比例缩短内容。
+    条目的来源列表；近重复合并后的条目带有多个来源。
+    key 为 SeenStore 使用的条目标识（id、链接或标题+内容的哈希）。
+    """
+    return item.get("sources") or [
+        {
+            "source": item.get("source", ""),
+            "link": item.get("link", ""),
+            "key": item_key(item),
+        }
+    ]
+
+
+def _covered_items(all_news: List[dict], used: List[dict]) -> List[dict]:
+    """原始条目中实际进入 prompt 的部分（合并、摘要或裁剪后的条目按来源与标识对应）"""
+    keys = {
+        (src.get("source", ""), src.get("key"))
+        for item in used
+        for src in _item_sources(item)
+    }
+    return [
+        item
+        for item in all_news
+        if (item.get("source", ""), item_key(item)) in keys
+    ]
+
+
+def _item_prefix(item: dict) -> str:
+    """条目在 prompt 中的头部：来源名与原始链接"""
+    prefix = f"【来源: {item.get('source', '')}】\n"
+    links = [s["link"] for s in _item_sources(item) if s.get("link")]
+    if links:
+        prefix += f"链接: {' ; '.join(links)}\n"
+    return prefix + "内容: "
+
+
+def _format_item(item: dict) -> str:
+    return f"{_item_prefix(item)}{item.get('content', '')}\n---\n"
+
+
+def _truncate_news_items(
+    all_news: List[dict], max_tokens: int, weights: Optional[Dict[str, float]] = None
+) -> List[dict]:
+    """
+    裁剪新闻项，确保格式化后的总 token 数不超过 max_tokens。
+    rank 模式按重要度保留整条（或轻度裁剪）的高分条目；proportional 模式
+    保留全部条目并等比例缩短内容。weights 为额外的频道权重（覆盖 CHANNEL_WEIGHTS）。
     """
     if not all_news:
         return []
 
-    # 先计算每条的基础信息与内容长度
+    # 先计算每条的基础信息与内容 token 数（count_tokens 按文本缓存）
     items = []
     overhead = 0
     for item in all_news:
-        source = item.get("source", "")
         content = item.get("content", "") or ""
         content = content[:ARTICLE_MAX_CHARS]
-        prefix = f"【来源: {source}】\n内容: "
+        prefix = _item_prefix(item)
         suffix = "\n---\n"
-        overhead += len(prefix) + len(suffix)
+        item_overhead = count_tokens(prefix + suffix)
+        overhead += item_overhead
         items.append(
-            {"item": item, "content": content, "prefix": prefix, "suffix": suffix}
+            {
+                "item": item,
+                "content": content,
+                "tokens": count_tokens(content),
+                "overhead": item_overhead,
+            }
         )
 
-    # 可用字符预算
-    budget = max_chars - overhead
+    # 可用 token 预算
+    budget = max_tokens - overhead
+    total_content_tokens = sum(x["tokens"] for x in items)
+    if total_content_tokens <= budget:
+        return [x["item"] for x in items]
+
+    if LLM_TRUNCATE_MODE == "rank":
+        return _select_ranked(items, max_tokens, weights)
+
     if budget <= 0:
         return all_news[:1]
 
     # 等比例分配内容长度，尽量保留更多条目
-    total_content_len = sum(len(x["content"]) for x in items)
-    if total_content_len <= budget:
-        return [x["item"] for x in items]
-
-    ratio = budget / max(total_content_len, 1)
+    ratio = budget / max(total_content_tokens, 1)
     result = []
     for x in items:
-        keep = max(50, int(len(x["content"]) * ratio))
+        keep = max(20, int(x["tokens"] * ratio))
         new_item = dict(x["item"])
-        new_item["content"] = x["content"][:keep]
+        new_item["content"] = truncate_to_tokens(x["content"], keep)
         result.append(new_item)
 
     return result
 
 
+# 流式输出时回调进度的最小间隔（秒），避免每个 token 都触发回调
+_STREAM_CALLBACK_INTERVAL = 0.25
+
+
+def _read_stream(
+    resp: requests.Response, on_delta: Callable[[str], None], attempt: int
+) -> str:
+    """读取 chat completions 的 SSE 流，按节流间隔回调当前累计的文本，返回完整内容"""
+    parts = []
+    usage = None
+    last_callback = 0.0
+    for raw in resp.iter_lines():
+        if not raw:
+            continue
+        # 按 UTF-8 解码：text/event-stream 通常不带 charset，requests 会误判编码
+        line = raw.decode("utf-8", errors="replace")
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:") :].strip()
+        if data == "[DONE]":
+            break
+        chunk = json.loads(data)
+        # 部分服务在最后一个分片中返回 usage
+        usage = chunk.get("usage") or usage
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        delta = (choices[0].get("delta") or {}).get("content") or ""
+        if not delta:
+            continue
+        parts.append(delta)
+        now = time.monotonic()
+        if now - last_callback >= _STREAM_CALLBACK_INTERVAL:
+            last_callback = now
+            on_delta("".join(parts))
+
+    content = "".join(parts)
+    logger.debug(f"[尝试 {attempt}] LLM 流式返回 content_len={len(content)}")
+    _record_usage(usage)
+    return content
+
+
+def _record_usage(usage: Optional[dict]):
+    """把响应中的 usage 计入 token 指标"""
+    if not usage:
+        return
+    for kind in ("prompt", "completion"):
+        value = usage.get(f"{kind}_tokens")
+        if isinstance(value, int):
+            metrics.inc("llm_tokens_total", value, kind=kind)
+
+
 def _call_llm_sync(
     prompt: str,
     max_tokens: int = 1200,
     attempt: int = 1,
+    on_delta: Optional[Callable[[str], None]] = None,
+) -> str:
+    """
+    带缓存的同步 LLM 调用：命中缓存直接返回，并发的相同请求只发出一次，
+    错误提示不会被缓存。参数与返回值同 _call_llm_uncached。
+    """
+    with metrics.timer("llm_call_seconds", stream=str(on_delta is not None).lower()):
+        if _llm_cache is None:
+            return _call_llm_uncached(prompt, max_tokens, attempt, on_delta)
+        key = LLMCache.make_key(
+            LLM_BASE_URL, LLM_MODEL, LLM_TEMPERATURE, max_tokens, prompt
+        )
+        return _llm_cache.get_or_compute(
+            key,
+            lambda: _call_llm_uncached(prompt, max_tokens, attempt, on_delta),
+            is_llm_error,
+        )
+
+
+def _call_llm_uncached(
+    prompt: str,
+    max_tokens: int = 1200,
+    attempt: int = 1,
+    on_delta: Optional[Callable[[str], None]] = None,
 ) -> str:
     """
     同步调用 LLM 的核心逻辑。
+    传入 on_delta 时使用流式输出，并在工作线程中以累计文本回调进度。
     返回 content 或错误提示字符串。
     """
-    base = LLM_BASE_URL.rstrip("/")
-    if base.endswith("/v1"):
-        url = f"{base}/chat/completions"
-    else:
-        url = f"{base}/v1/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {LLM_API_KEY}",
-    }
+    url = _llm_client.url
     payload = {
         "model": LLM_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "max_tokens": max_tokens,
         "temperature": LLM_TEMPERATURE,
     }
+    stream = on_delta is not None
+    if stream:
+        payload["stream"] = True
 
     for i in range(LLM_RETRIES + 1):
         try:
-            resp = requests.post(
-                url, json=payload, headers=headers, timeout=LLM_TIMEOUT
-            )
+            resp = _llm_client.post(payload, stream=stream)
         except Exception as e:
             if isinstance(e, requests.exceptions.Timeout):
                 err_msg = "LLM 调用超时，请稍后重试。"
@@ -113,9 +307,10 @@ def _call_llm_sync(
             logger.exception(f"[尝试 {attempt}.{i}] LLM 请求失败：%s", e)
             report_error(e, {"url": url, "attempt": attempt, "retry": i})
             if i < LLM_RETRIES:
-                time.sleep(LLM_RETRY_BACKOFF * (i + 1))
+                metrics.inc("llm_retries_total", reason=type(e).__name__)
+                time.sleep(_llm_client.retry_delay(None, i))
                 continue
-            return err_msg
+            return LLMErrorMessage(err_msg)
 
         if resp.status_code in (429, 500, 502, 503, 504):
             logger.warning(
@@ -125,7 +320,9 @@ def _call_llm_sync(
                 resp.status_code,
             )
             if i < LLM_RETRIES:
-                time.sleep(LLM_RETRY_BACKOFF * (i + 1))
+                metrics.inc("llm_retries_total", reason=str(resp.status_code))
+                resp.close()
+                time.sleep(_llm_client.retry_delay(resp, i))
                 continue
             # fall through to error handling below
         # non-retryable status or retries exhausted
@@ -148,19 +345,33 @@ def _call_llm_sync(
 
         # 识别常见错误
         if parsed_err and parsed_err.get("code") == "40003":
-            return "LLM API key 无效或不存在，请检查 LLM_API_KEY。"
+            return LLMErrorMessage("LLM API key 无效或不存在，请检查 LLM_API_KEY。")
         if (
             parsed_err
             and isinstance(parsed_err.get("message"), str)
             and "key does not exist" in parsed_err.get("message")
         ):
-            return "LLM API key 无效或不存在，请检查 LLM_API_KEY。"
+            return LLMErrorMessage("LLM API key 无效或不存在，请检查 LLM_API_KEY。")
         if "key does not exist" in (resp.text or ""):
-            return "LLM API key 无效或不存在，请检查 LLM_API_KEY。"
+            return LLMErrorMessage("LLM API key 无效或不存在，请检查 LLM_API_KEY。")
 
         if 400 <= resp.status_code < 500:
-            return f"LLM 请求被拒绝（{resp.status_code}），请检查请求参数。"
-        return f"LLM 调用失败：{resp.status_code}"
+            return LLMErrorMessage(f"LLM 请求被拒绝（{resp.status_code}），请检查请求参数。")
+        return LLMErrorMessage(f"LLM 调用失败：{resp.status_code}")
+
+    if stream:
+        try:
+            content = _read_stream(resp, on_delta, attempt)
+        except Exception as e:
+            logger.exception(f"[尝试 {attempt}] 读取 LLM 流式响应失败：%s", e)
+            report_error(e, {"attempt": attempt, "stream": True})
+            return LLMErrorMessage("读取 LLM 流式响应失败，详见日志。")
+        finally:
+            resp.close()
+        if not content.strip():
+            logger.error(f"[尝试 {attempt}] LLM 流式返回空内容")
+            return LLMErrorMessage("LLM 未返回可用内容，请检查日志或稍后重试。")
+        return content
 
     try:
         data = resp.json()
@@ -176,6 +387,7 @@ def _call_llm_sync(
             logger.debug(
                 f"[尝试 {attempt}] LLM 返回 content_len={len(content)}, tokens={data.get('usage', {})}"
             )
+            _record_usage(data.get("usage"))
 
             # 检查内容是否为空
             if not content or not str(content).strip():
@@ -187,17 +399,50 @@ def _call_llm_sync(
                     Exception("LLM returned empty content"),
                     {"response": data, "attempt": attempt},
                 )
-                return "LLM 未返回可用内容，请检查日志或稍后重试。"
+                return LLMErrorMessage("LLM 未返回可用内容，请检查日志或稍后重试。")
 
             return content
 
         logger.error(f"[尝试 {attempt}] LLM 返回格式不符合预期：%s", data)
-        return "LLM 返回了不可解析的响应，详见日志。"
+        return LLMErrorMessage("LLM 返回了不可解析的响应，详见日志。")
 
     except Exception as e:
         logger.exception(f"[尝试 {attempt}] 解析 LLM 响应失败：%s", e)
         report_error(e, {"response_text": resp.text, "attempt": attempt})
-        return "解析 LLM 响应失败，详见日志。"
+        return LLMErrorMessage("解析 LLM 响应失败，详见日志。")
+
+
+def _select_ranked(
+    items: List[dict], max_tokens: int, weights: Optional[Dict[str, float]] = None
+) -> List[dict]:
+    """按重要度（时效、覆盖频道数、长度、频道权重）选取放得下的条目"""
+    now = time.time()
+    if weights:
+        weights = {**_CHANNEL_WEIGHTS, **weights}
+    else:
+        weights = _CHANNEL_WEIGHTS
+    costs = [x["tokens"] for x in items]
+    overheads = [x["overhead"] for x in items]
+    scores = [
+        score_item(x["item"], x["tokens"], now, RANK_HALF_LIFE_HOURS, weights)
+        for x in items
+    ]
+
+    def trim(i: int, keep: int) -> dict:
+        new_item = dict(items[i]["item"])
+        new_item["content"] = truncate_to_tokens(items[i]["content"], keep)
+        return new_item
+
+    # 整条保留时使用已按 ARTICLE_MAX_CHARS 截断的内容
+    whole = [
+        x["item"]
+        if x["content"] == x["item"].get("content")
+        else dict(x["item"], content=x["content"])
+        for x in items
+    ]
+    selected = select_items(whole, costs, overheads, max_tokens, scores, trim)
+    logger.info("输入超出预算，按重要度保留 %d/%d 条", len(selected), len(items))
+    return selected
 
 
 def _build_prompt(context: str) -> str:
@@ -226,36 +471,279 @@ def _build_prompt(context: str) -> str:
 """
 
 
-async def analyze_news(all_news: List[dict]) -> str:
+def _build_map_prompt(context: str) -> str:
+    return f"""你是一个资深的新闻分析师。以下是一批来自不同来源的资讯信息（完整资讯的一部分）：
+{context}
+
+请执行以下任务：
+1. 聚合相同事件：将讨论同一件事的新闻归类。
+2. 选出本批次中最值得关注的至多 15 个事件。
+
+输出格式（严格遵守）：
+【序号】标题
+- 摘要：1-2 句，保留关键数字与细节
+- 来源：[来源名](URL); [来源名](URL)
+
+要求：
+- 每条必须是不同事件，不要编造或重复
+- 来源必须使用原始链接，若有 Telegram 消息链接则优先使用（t.me/ 开头）
+- 不要输出其他说明文字
+"""
+
+
+def _build_summary_prompt(context: str) -> str:
+    return f"""你是一个资深的新闻编辑。以下是若干条带编号的资讯：
+{context}
+
+请为每一条资讯写一句摘要（不超过 60 字），保留关键主体、数字与细节。
+
+输出格式（严格遵守，每条一行，编号与输入一致）：
+【编号】摘要
+
+要求：
+- 每个编号输出且只输出一行，不要合并、遗漏或编造
+- 不要输出链接或其他说明文字
+"""
+
+
+def _summarize_batch(entries: List[tuple]) -> Dict[str, str]:
+    """entries 为 (key, 标题, 内容)；返回 key -> 摘要，未能解析出的条目不在结果中"""
+    parts = []
+    for idx, (_, title, content) in enumerate(entries, 1):
+        head = f"标题: {title}\n" if title else ""
+        parts.append(f"【{idx}】\n{head}内容: {content}\n---\n")
+    result = _call_llm_sync(
+        _build_summary_prompt("".join(parts)), LLM_SUMMARY_MAX_TOKENS
+    )
+    if is_llm_error(result) or not isinstance(result, str):
+        logger.warning("条目摘要失败：%s", result)
+        return {}
+    summaries = {}
+    for match in _SUMMARY_LINE_RE.finditer(result):
+        idx = int(match.group(1)) - 1
+        if 0 <= idx < len(entries):
+            summaries[entries[idx][0]] = match.group(2)[:LLM_SUMMARY_MAX_CHARS]
+    return summaries
+
+
+def _split_summary_batches(entries: List[tuple]) -> List[List[tuple]]:
+    """按 token 数把待摘要的 (key, 标题, 内容) 装入批次"""
+    batches = []
+    current = []
+    size = 0
+    for entry in entries:
+        n = count_tokens(entry[1]) + count_tokens(entry[2])
+        if current and size + n > LLM_SUMMARY_BATCH_TOKENS:
+            batches.append(current)
+            current = []
+            size = 0
+        current.append(entry)
+        size += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _summarize_items(items: List[dict]) -> List[dict]:
     """
-    异步分析新闻。
+    hierarchical 模式第一层：把每条内容替换为短摘要。
+    摘要按内容哈希持久缓存，只有新条目（或内容变化的条目）需要调用 LLM；
+    本身已足够短的条目直接使用原文，摘要失败的条目回退为原文。
+    """
+    loop = asyncio.get_running_loop()
+    keys = []
+    pending = {}
+    for item in items:
+        title = item.get("title") or ""
+        content = (item.get("content") or "")[:ARTICLE_MAX_CHARS]
+        if len(content) <= LLM_SUMMARY_MAX_CHARS:
+            keys.append(None)
+            continue
+        key = summary_key(LLM_MODEL, title, content)
+        keys.append(key)
+        pending[key] = (key, title, content)
+
+    summaries = await loop.run_in_executor(None, _summary_cache.get_many, list(pending))
+    missing = [entry for key, entry in pending.items() if key not in summaries]
+    metrics.inc("summary_cache_items_total", len(pending) - len(missing), result="hit")
+    metrics.inc("summary_cache_items_total", len(missing), result="miss")
+
+    if missing:
+        batches = _split_summary_batches(missing)
+        results = await asyncio.gather(
+            *(loop.run_in_executor(_executor, _summarize_batch, b) for b in batches)
+        )
+        fresh = {}
+        for result in results:
+            fresh.update(result)
+        await loop.run_in_executor(None, _summary_cache.put_many, fresh)
+        summaries.update(fresh)
+        logger.info(
+            "条目摘要：%d 条命中缓存，%d 条新摘要（%d 个请求），%d 条失败",
+            len(pending) - len(missing),
+            len(fresh),
+            len(batches),
+            len(missing) - len(fresh),
+        )
 
-    简化流程：
-    1. 裁剪新闻项
-    2. 完整 prompt 调用
+    summarized = []
+    for item, key in zip(items, keys):
+        summary = summaries.get(key) if key is not None else None
+        summarized.append(item if summary is None else {**item, "content": summary})
+    return summarized
+
+
+def _split_batches(items: List[dict], max_tokens: int) -> List[List[dict]]:
+    """按频道分组后依次装入批次，每批格式化后的 token 数不超过 max_tokens（单条超长时独占一批）"""
+    groups = {}
+    for item in items:
+        groups.setdefault(item.get("source", ""), []).append(item)
+
+    batches = []
+    current = []
+    size = 0
+    for group in groups.values():
+        for item in group:
+            n = count_tokens(_format_item(item))
+            if current and size + n > max_tokens:
+                batches.append(current)
+                current = []
+                size = 0
+            current.append(item)
+            size += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _analyze_map_reduce(
+    batches: List[List[dict]], on_delta: Optional[Callable[[str], None]] = None
+) -> Tuple[str, List[dict]]:
     """
-    # 裁剪输入以确保不超过上下文限制
-    max_input_chars = ESTIMATED_CONTEXT_LIMIT - ESTIMATED_COMPLETION_LIMIT
-    truncated_news = _truncate_news_items(all_news, max_input_chars)
+    map：各批次在 _executor 上并行提炼要点；
+    reduce：把所有批次的要点合并为 _build_prompt 的 top-10 格式。
+    返回 (结果, 要点进入 reduce 的批次中的条目)；失败跳过的批次不计入。
+    """
+    loop = asyncio.get_running_loop()
+    logger.info("mapreduce 分析：%d 个批次", len(batches))
+
+    partials = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                _executor,
+                _call_llm_sync,
+                _build_map_prompt("".join(_format_item(it) for it in batch)),
+                LLM_MAP_MAX_TOKENS,
+                idx + 1,
+            )
+            for idx, batch in enumerate(batches)
+        )
+    )
 
-    # 构建上下文
-    context = ""
-    for item in truncated_news:
-        context += f"【来源: {item['source']}】\n内容: {item.get('content','')}\n---\n"
+    summaries = []
+    used = []
+    for idx, partial in enumerate(partials):
+        if is_llm_error(partial) or not str(partial).strip():
+            logger.warning("mapreduce 批次 %d 失败，已跳过：%s", idx + 1, partial)
+            continue
+        summaries.append(f"【批次 {idx + 1}】\n{partial.strip()}\n---\n")
+        used.extend(batches[idx])
 
-    loop = asyncio.get_running_loop()
+    if not summaries:
+        return partials[0], []
 
-    # 第一次调用：完整 prompt
     content = await loop.run_in_executor(
         _executor,
         _call_llm_sync,
-        _build_prompt(context),
-        LLM_MAX_TOKENS,  # max_tokens
-        1,  # attempt
+        _build_prompt("".join(summaries)),
+        LLM_MAX_TOKENS,
+        len(batches) + 1,
+        on_delta,
     )
+    return content, used
+
+
+def _input_token_budget() -> int:
+    """新闻内容可用的 token 预算：上下文 - 输出预留 - prompt 模板，并留出安全余量"""
+    available = LLM_CONTEXT_TOKENS - COMPLETION_RESERVE_TOKENS
+    available = int(available * (1 - LLM_TOKEN_SAFETY_MARGIN))
+    return available - count_tokens(_build_prompt(""))
+
+
+def _threadsafe_callback(
+    callback: Callable[[str], None], loop: asyncio.AbstractEventLoop
+) -> Callable[[str], None]:
+    """把工作线程中的回调转交给事件循环执行"""
+    return lambda text: loop.call_soon_threadsafe(callback, text)
+
+
+async def analyze_news(
+    all_news: List[dict],
+    on_progress: Optional[Callable[[str], None]] = None,
+    weights: Optional[Dict[str, float]] = None,
+) -> Tuple[str, List[dict]]:
+    """
+    异步分析新闻，返回 (报告, 实际进入 prompt 的原始条目)。
+    超出预算被裁掉的条目、mapreduce 中失败跳过的批次不在其中，下次简报仍会分析。
+    LLM_STREAM 开启且传入 on_progress 时，最终结果以流式生成，
+    on_progress 会在事件循环中以当前累计的文本被反复调用。
+    weights 为订阅中设置的频道权重，用于超出预算时的重要度排序。
 
-    return (
-        content
-        if isinstance(content, str) and content.strip()
-        else "LLM 未返回可用内容，请检查日志或稍后重试。"
+    简化流程：
+    1. 跨频道近重复合并
+    2. hierarchical 模式下把每条内容替换为（缓存的）短摘要
+    3. 裁剪新闻项
+    4. 完整 prompt 调用；mapreduce 模式下分批并行摘要后再合并
+    """
+    loop = asyncio.get_running_loop()
+    original_news = all_news
+    # 先记下各条目的来源与标识：合并、摘要与裁剪会改写内容，按内容哈希的标识随之变化
+    all_news = [{**item, "sources": _item_sources(item)} for item in all_news]
+
+    if DEDUP_ENABLED:
+        # process 模式下签名在进程池中分块计算，合并本身仍在线程中完成
+        sigs = await cpu_backend.signatures(all_news)
+        all_news = await loop.run_in_executor(
+            None, dedup_news, all_news, DEDUP_THRESHOLD, sigs
+        )
+
+    if _summary_cache is not None:
+        all_news = await _summarize_items(all_news)
+
+    # 裁剪输入以确保不超过上下文限制
+    max_input_tokens = _input_token_budget()
+    with metrics.timer("truncate_seconds"):
+        truncated_news = _truncate_news_items(all_news, max_input_tokens, weights)
+    metrics.inc("truncate_items_total", len(truncated_news), result="kept")
+    metrics.inc(
+        "truncate_items_total", len(all_news) - len(truncated_news), result="dropped"
     )
+
+    on_delta = None
+    if LLM_STREAM and on_progress is not None:
+        on_delta = _threadsafe_callback(on_progress, loop)
+
+    batches = []
+    if LLM_ANALYSIS_MODE == "mapreduce":
+        batches = _split_batches(truncated_news, LLM_MAPREDUCE_BATCH_TOKENS)
+
+    if len(batches) > 1:
+        content, used = await _analyze_map_reduce(batches, on_delta)
+    else:
+        used = truncated_news
+        # 构建上下文
+        context = "".join(_format_item(item) for item in truncated_news)
+
+        # 第一次调用：完整 prompt
+        content = await loop.run_in_executor(
+            _executor,
+            _call_llm_sync,
+            _build_prompt(context),
+            LLM_MAX_TOKENS,  # max_tokens
+            1,  # attempt
+            on_delta,
+        )
+
+    if not isinstance(content, str) or not content.strip():
+        content = LLMErrorMessage("LLM 未返回可用内容，请检查日志或稍后重试。")
+    return content, _covered_items(original_news, used)
@@ -0,0 +1,175 @@
+"""
+检查跨频道近重复合并的质量：用三组带真实标签的合成条目运行 dedup.dedup_news，
+统计错误合并（不同新闻进了同一簇）与漏合并（同一新闻在不同频道未合并）。
+
+- template：同一频道模板（开头标签、订阅提示）下的不同快讯，只有主体、事件与金额不同
+  （金额各不相同：措辞与数字都相同、只差主体的两条快讯，靠文本相似度无法区分）
+- fake_rsshub：benchmarks/fake_rsshub.py 的合成新闻，同一模板、不同编号与金额
+- reposts：同一条快讯被多个频道转发，各频道加上自己的前后缀，部分改写半句
+
+出现错误合并时以非零状态退出。
+
+用法：
+    python benchmarks/dedup_quality.py
+    python benchmarks/dedup_quality.py --threshold 0.4 --items 1000
+"""
+
+import os
+import sys
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_rsshub  # noqa: E402
+from config import DEDUP_THRESHOLD  # noqa: E402
+from dedup import dedup_news  # noqa: E402
+from normalize import html_to_text  # noqa: E402
+
+_SUBJECTS = [
+    "美联储", "英伟达", "特斯拉", "苹果", "欧盟委员会", "日本央行",
+    "台积电", "沙特阿美", "微软", "软银", "中国人民银行", "亚马逊",
+]
+_ACTIONS = ["宣布", "计划", "否认", "完成", "暂停", "启动", "批准", "推迟"]
+_THINGS = [
+    "回购计划", "并购交易", "新一轮融资", "产能扩张", "反垄断调查",
+    "降息决议", "芯片出口许可", "数据中心建设", "裁员方案", "债券发行",
+]
+# 转发频道各自固定的前后缀
+_REPOST_STYLES = [
+    ("", "\n频道 @abc"),
+    ("转：", "（来源：彭博）"),
+    ("#快讯 ", "\n👉 订阅 @news_cn 获取更多"),
+    ("【突发】", ""),
+    ("据路透社，", "\n投稿 @tips_bot"),
+]
+
+
+def _flashes(n: int, rng: random.Random) -> list:
+    amounts = rng.sample(range(1, 10000), n)
+    return [
+        (rng.choice(_SUBJECTS), rng.choice(_ACTIONS), rng.choice(_THINGS), amount)
+        for amount in amounts
+    ]
+
+
+def _flash_text(story: tuple) -> str:
+    subject, action, thing, amount = story
+    return (
+        f"{subject}{action}{thing}，涉及金额约{amount}亿美元，"
+        "市场人士称此举将影响相关板块走势。"
+    )
+
+
+def template_set(n: int, rng: random.Random) -> list:
+    items = []
+    for i, story in enumerate(_flashes(n, rng)):
+        channel = f"flash_{i % 10}"
+        items.append(
+            {
+                "source": channel,
+                "title": "",
+                "link": f"https://t.me/{channel}/{i}",
+                "content": f"【快讯】{_flash_text(story)}关注我们获取更多实时财经快讯。",
+                "truth": story,
+            }
+        )
+    return items
+
+
+def fake_rsshub_set(n: int, rng: random.Random) -> list:
+    items = []
+    for i in range(n):
+        story_id = rng.randrange(fake_rsshub._STORY_POOL)
+        channel = f"bench_{rng.randrange(30)}"
+        description = fake_rsshub._description(story_id, rng.randrange(1000), False)
+        items.append(
+            {
+                "source": channel,
+                "title": fake_rsshub._story(story_id, 0)[:40],
+                "link": f"https://t.me/{channel}/{i}",
+                "content": html_to_text(description)[0],
+                "truth": story_id,
+            }
+        )
+    return items
+
+
+def repost_set(n: int, rng: random.Random) -> list:
+    items = []
+    for k, story in enumerate(_flashes(n, rng)):
+        for c in rng.sample(range(len(_REPOST_STYLES)), rng.randint(1, 3)):
+            text = _flash_text(story)
+            if rng.random() < 0.5:
+                text = text.replace("市场人士称此举将影响相关板块走势。", "分析认为相关板块或受影响。")
+            prefix, suffix = _REPOST_STYLES[c]
+            items.append(
+                {
+                    "source": f"repost_{c}",
+                    "title": "",
+                    "link": f"https://t.me/repost_{c}/{k}",
+                    "content": prefix + text + suffix,
+                    "truth": k,
+                }
+            )
+    return items
+
+
+def evaluate(items: list, threshold: float) -> dict:
+    truth_of = {item["link"]: item["truth"] for item in items}
+    merged = dedup_news([dict(item) for item in items], threshold)
+    wrong = 0
+    clusters = {}
+    for item in merged:
+        links = [s["link"] for s in item.get("sources", [])] or [item["link"]]
+        truths = {truth_of[link] for link in links}
+        if len(truths) > 1:
+            wrong += 1
+        for truth in truths:
+            clusters.setdefault(truth, []).append(item)
+    # 同一新闻在不同频道的条目理应合并成一簇；同频道的重复本就不合并，不计入漏合并
+    missed = 0
+    for truth, group in clusters.items():
+        missed += max(0, len(group) - _max_per_channel(items, truth))
+    return {
+        "items": len(items),
+        "stories": len({item["truth"] for item in items}),
+        "clusters": len(merged),
+        "wrong_merges": wrong,
+        "missed_merges": missed,
+    }
+
+
+def _max_per_channel(items: list, truth) -> int:
+    counts = {}
+    for item in items:
+        if item["truth"] == truth:
+            counts[item["source"]] = counts.get(item["source"], 0) + 1
+    return max(counts.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查近重复合并的错误合并与漏合并")
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    parser.add_argument("--items", type=int, default=300, help="每组的新闻条数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failed = False
+    for name, build in (
+        ("template", template_set),
+        ("fake_rsshub", fake_rsshub_set),
+        ("reposts", repost_set),
+    ):
+        stats = evaluate(build(args.items, random.Random(args.seed)), args.threshold)
+        print(
+            f"{name:12} {stats['items']:5} items  {stats['stories']:5} stories  "
+            f"{stats['clusters']:5} clusters  {stats['wrong_merges']:3} wrong merges  "
+            f"{stats['missed_merges']:3} missed merges"
+        )
+        failed = failed or stats["wrong_merges"] > 0
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+本地模拟的 OpenAI 兼容 chat completions 服务（/v1/chat/completions），支持流式输出。
+条目摘要请求（hierarchical 模式）按编号逐条返回摘要，其他请求返回固定格式的 top-10。
+
+响应耗时 = latency + 输出 token 数 / tokens_per_second；返回 usage（prompt 按字符数粗略估计）。
+
+用法：
+    python benchmarks/fake_llm.py --port 1300 --latency 0.5 --tokens-per-second 200
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# hierarchical 模式的条目摘要请求：按输入编号逐行返回摘要
+_SUMMARY_ITEM_RE = re.compile(r"^【(\d+)】\n(?:标题: .*\n)?内容: (.{0,40})", re.MULTILINE)
+
+
+def _report(prompt: str) -> str:
+    if "请为每一条资讯写一句摘要" in prompt:
+        return "\n".join(
+            f"【{m.group(1)}】摘要：{m.group(2)}" for m in _SUMMARY_ITEM_RE.finditer(prompt)
+        )
+    sections = []
+    for i in range(1, 11):
+        sections.append(
+            f"【{i}】基准测试新闻标题 {i}\n"
+            f"- 摘要：模拟的分析结果，输入长度 {len(prompt)} 字符。\n"
+            f"- 来源：[bench](https://t.me/bench/{i})"
+        )
+    return "\n\n".join(sections)
+
+
+class FakeLLM:
+    def __init__(self, latency: float = 0.0, tokens_per_second: float = 0.0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def handler(self):
+        llm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with llm._lock:
+                    llm.calls += 1
+                prompt = "".join(
+                    m.get("content", "") for m in body.get("messages", [])
+                )
+                text = _report(prompt)
+                usage = {
+                    "prompt_tokens": len(prompt) // 2,
+                    "completion_tokens": len(text) // 2,
+                }
+                if llm.latency > 0:
+                    time.sleep(llm.latency)
+                if body.get("stream"):
+                    self._stream(text, usage)
+                else:
+                    if llm.tokens_per_second > 0:
+                        time.sleep(usage["completion_tokens"] / llm.tokens_per_second)
+                    out = json.dumps(
+                        {
+                            "choices": [{"message": {"content": text}}],
+                            "usage": usage,
+                        },
+                        ensure_ascii=False,
+                    ).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(out)))
+                    self.end_headers()
+                    self.wfile.write(out)
+
+            def _stream(self, text, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                step = 8
+                pause = step / 2 / llm.tokens_per_second if llm.tokens_per_second else 0
+                for i in range(0, len(text), step):
+                    delta = {"choices": [{"delta": {"content": text[i : i + step]}}]}
+                    self._chunk(f"data: {json.dumps(delta, ensure_ascii=False)}\n\n")
+                    if pause:
+                        time.sleep(pause)
+                self._chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n")
+                self._chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, data: str):
+                raw = data.encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(raw), raw))
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def serve(self, host: str, port: int) -> ThreadingHTTPServer:
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 LLM 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1300)
+    parser.add_argument("--latency", type=float, default=0.0, help="首字节前的延迟（秒）")
+    parser.add_argument(
+        "--tokens-per-second", type=float, default=0.0, help="输出速度（0 表示立即返回）"
+    )
+    args = parser.parse_args()
+
+    server = FakeLLM(args.latency, args.tokens_per_second).serve(args.host, args.port)
+    print(f"fake LLM on http://{args.host}:{args.port}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
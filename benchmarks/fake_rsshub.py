@@ -0,0 +1,205 @@
+"""
+本地模拟的 RSSHub：/telegram/channel/<id> 返回合成（或录制的）RSS feed。
+
+可配置响应延迟、错误率（503）、超大条目比例；支持 ETag / If-None-Match 返回 304。
+
+用法：
+    python benchmarks/fake_rsshub.py --port 1200 --latency 0.05 --error-rate 0.02
+    python benchmarks/fake_rsshub.py --feeds-dir recorded/   # <channel>.xml，缺失时用合成内容
+"""
+
+import os
+import sys
+import html
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PREFIX = "/telegram/channel/"
+
+# 合成内容的素材：同一 story 会以不同措辞出现在多个频道，用于覆盖近重复合并
+_TOPICS = ["大模型", "芯片", "开源", "机器人", "自动驾驶", "融资", "监管", "算力"]
+_COMPANIES = ["OpenAI", "Anthropic", "Google", "Meta", "NVIDIA", "DeepSeek", "阿里", "字节"]
+_STORY_POOL = 400
+
+
+def _story(story_id: int, variant: int) -> str:
+    rng = random.Random(story_id)
+    company = rng.choice(_COMPANIES)
+    topic = rng.choice(_TOPICS)
+    number = rng.randint(2, 900)
+    openers = ["据报道，", "消息称，", "最新：", ""]
+    body = (
+        f"{openers[variant % len(openers)]}{company} 在{topic}领域发布新进展，"
+        f"第 {story_id} 号事件涉及约 {number} 亿元投入。"
+        f"业内人士认为这将影响{topic}行业的竞争格局，"
+        f"{company} reportedly plans a wider rollout next quarter. "
+    )
+    return body * (1 + rng.randint(0, 3))
+
+
+def _description(story_id: int, variant: int, oversized: bool) -> str:
+    text = _story(story_id, variant)
+    if oversized:
+        text += "<p>" + "超长内容 " * 40000 + "</p>"
+    return (
+        f"<p>{text}</p>"
+        f'<a href="https://example.com/news/{story_id}?utm_source=telegram&amp;utm_medium=channel">'
+        f"https://example.com/news/{story_id}</a><br>"
+        f'<img src="https://cdn.example.com/{story_id}.jpg"><br>'
+        f"频道：@bench_channel | 投稿：@bench_bot"
+    )
+
+
+def synthetic_feed(channel_id: str, items: int, oversized_rate: float) -> bytes:
+    """按频道确定性生成 feed；oversized_rate 比例的条目带有超大摘要"""
+    seed = int(hashlib.sha1(channel_id.encode()).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    now = time.time()
+    entries = []
+    for i in range(items):
+        story_id = rng.randrange(_STORY_POOL)
+        published = time.strftime(
+            "%a, %d %b %Y %H:%M:%S GMT", time.gmtime(now - i * 1800 - rng.random() * 900)
+        )
+        description = _description(story_id, seed + i, rng.random() < oversized_rate)
+        entries.append(
+            f"<item><title>{html.escape(_story(story_id, 0)[:40])}</title>"
+            f"<description>{html.escape(description)}</description>"
+            f"<link>https://t.me/{channel_id}/{1000 + i}</link>"
+            f"<guid>https://t.me/{channel_id}/{1000 + i}</guid>"
+            f"<pubDate>{published}</pubDate></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>{channel_id}</title><link>https://t.me/s/{channel_id}</link>"
+        + "".join(entries)
+        + "</channel></rss>"
+    ).encode("utf-8")
+
+
+class FakeRSSHub:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        oversized_rate: float = 0.0,
+        items: int = 20,
+        feeds_dir: str = "",
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.oversized_rate = oversized_rate
+        self.items = items
+        self.feeds_dir = feeds_dir
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._feeds = {}
+        self._feeds_lock = threading.Lock()
+
+    def feed(self, channel_id: str):
+        """返回 (body, etag)，按频道缓存"""
+        with self._feeds_lock:
+            cached = self._feeds.get(channel_id)
+        if cached is not None:
+            return cached
+        body = None
+        if self.feeds_dir:
+            path = os.path.join(self.feeds_dir, f"{channel_id}.xml")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    body = f.read()
+        if body is None:
+            body = synthetic_feed(channel_id, self.items, self.oversized_rate)
+        result = (body, '"%s"' % hashlib.sha1(body).hexdigest()[:16])
+        with self._feeds_lock:
+            self._feeds[channel_id] = result
+        return result
+
+    def random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def handler(self):
+        hub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if not path.startswith(_PREFIX):
+                    self._send(404, b"not found")
+                    return
+                delay = hub.latency + hub.jitter * hub.random()
+                if delay > 0:
+                    time.sleep(delay)
+                if hub.random() < hub.error_rate:
+                    self._send(503, b"unavailable")
+                    return
+                body, etag = hub.feed(path[len(_PREFIX) :].strip("/"))
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, b"", etag)
+                    return
+                self._send(200, body, etag)
+
+            def _send(self, status, body, etag=None):
+                self.send_response(status)
+                if status == 200:
+                    self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def serve(self, host: str, port: int) -> ThreadingHTTPServer:
+        server = ThreadingHTTPServer((host, port), self.handler())
+        server.daemon_threads = True
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 RSSHub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1200)
+    parser.add_argument("--latency", type=float, default=0.0, help="基础延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="附加随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的比例")
+    parser.add_argument("--oversized-rate", type=float, default=0.0, help="超大条目比例")
+    parser.add_argument("--items", type=int, default=20, help="每个 feed 的条目数")
+    parser.add_argument("--feeds-dir", default="", help="录制的 feed 目录")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    hub = FakeRSSHub(
+        args.latency,
+        args.jitter,
+        args.error_rate,
+        args.oversized_rate,
+        args.items,
+        args.feeds_dir,
+        args.seed,
+    )
+    server = hub.serve(args.host, args.port)
+    print(f"fake RSSHub on http://{args.host}:{args.port}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
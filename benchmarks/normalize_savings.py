@@ -0,0 +1,99 @@
+"""
+统计 HTML 清洗对 prompt 体积的影响：对每个订阅源抓取原始 feed，
+比较原始摘要与 normalize.html_to_text 结果的字符数与 token 数，并给出清洗耗时。
+
+用法：
+    python benchmarks/normalize_savings.py                 # 当前订阅列表
+    python benchmarks/normalize_savings.py ch1 ch2 --limit 20
+    python benchmarks/normalize_savings.py --file feed1.xml --file feed2.xml
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feedparser  # noqa: E402
+import httpx  # noqa: E402
+from config import RSSHUB_BASE_URL, RSSHUB_TIMEOUT  # noqa: E402
+from fetcher import list_subscriptions, _rss_url  # noqa: E402
+from normalize import html_to_text  # noqa: E402
+from tokens import count_tokens  # noqa: E402
+
+
+def _load_feeds(args):
+    """返回 [(名称, 原始摘要列表)]"""
+    feeds = []
+    for path in args.file:
+        with open(path, "rb") as f:
+            feed = feedparser.parse(f.read())
+        feeds.append((os.path.basename(path), feed.entries[: args.limit]))
+    if args.file and not args.channels:
+        return feeds
+    channels = args.channels or list_subscriptions()
+    with httpx.Client(timeout=RSSHUB_TIMEOUT, follow_redirects=True) as client:
+        for channel_id in channels:
+            url = _rss_url(args.base, channel_id)
+            try:
+                resp = client.get(url)
+                resp.raise_for_status()
+            except Exception as e:
+                print(f"跳过 {channel_id}：{e}", file=sys.stderr)
+                continue
+            entries = feedparser.parse(resp.content).entries[: args.limit]
+            feeds.append((channel_id, entries))
+    return feeds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("channels", nargs="*", help="频道 ID（默认当前订阅列表）")
+    parser.add_argument("--file", action="append", default=[], help="本地 feed 文件")
+    parser.add_argument("--base", default=RSSHUB_BASE_URL, help="RSSHub 实例")
+    parser.add_argument("--limit", type=int, default=20, help="每个源的条目数")
+    args = parser.parse_args()
+
+    rows = []
+    total = dict.fromkeys(
+        ("items", "raw_chars", "text_chars", "raw_tokens", "text_tokens"), 0
+    )
+    elapsed = 0.0
+    for name, entries in _load_feeds(args):
+        raw = [e.get("summary", "") for e in entries]
+        started = time.perf_counter()
+        texts = [html_to_text(r)[0] for r in raw]
+        elapsed += time.perf_counter() - started
+        row = {
+            "items": len(raw),
+            "raw_chars": sum(len(r) for r in raw),
+            "text_chars": sum(len(t) for t in texts),
+            "raw_tokens": sum(count_tokens(r) for r in raw),
+            "text_tokens": sum(count_tokens(t) for t in texts),
+        }
+        rows.append((name, row))
+        for key in total:
+            total[key] += row[key]
+
+    if not total["items"]:
+        print("没有可统计的条目")
+        return
+
+    header = f"{'source':<24}{'items':>6}{'chars/item':>16}{'tokens/item':>16}{'saved':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, row in rows + [("TOTAL", total)]:
+        n = max(row["items"], 1)
+        saved = 1 - row["text_tokens"] / max(row["raw_tokens"], 1)
+        print(
+            f"{name[:23]:<24}{row['items']:>6}"
+            f"{row['raw_chars'] / n:>8.0f}->{row['text_chars'] / n:<6.0f}"
+            f"{row['raw_tokens'] / n:>8.0f}->{row['text_tokens'] / n:<6.0f}"
+            f"{saved:>8.1%}"
+        )
+    print(f"\n清洗耗时：{elapsed / total['items'] * 1e6:.1f} µs/item")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+抓取 + 分析流水线基准：在子进程中启动本地模拟 RSSHub 与 LLM，按 10/100/1000 个频道规模
+分别运行 aget_all_news + analyze_news，以 JSON 输出简报耗时 p50/p99、峰值 RSS 与 CPU 时间。
+
+每个规模在独立的子进程中运行，峰值 RSS 与 CPU 时间互不影响，也不包含模拟服务本身。
+
+用法：
+    python benchmarks/pipeline.py                                # 10,100,1000 个频道，每档 5 轮
+    python benchmarks/pipeline.py --scales 10,100 --runs 10 -o result.json
+    python benchmarks/pipeline.py --rss-latency 0.05 --rss-jitter 0.1 --error-rate 0.02
+    python benchmarks/pipeline.py --revalidate                   # 启用 feed 缓存（TTL=0），后续轮次走 304
+    python benchmarks/pipeline.py --analysis-mode hierarchical   # 条目摘要缓存，后续轮次命中
+    python benchmarks/pipeline.py --cpu-backend process          # 解析/清理/去重签名走进程池
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_HERE)
+
+
+def _percentile(values, q):
+    """最近秩分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _stats(values):
+    return {
+        "p50": _percentile(values, 0.5),
+        "p99": _percentile(values, 0.99),
+        "mean": sum(values) / len(values) if values else None,
+    }
+
+
+def _usage():
+    """返回 (CPU 秒（含已退出的子进程，如 CPU 进程池）, 峰值 RSS 字节, 子进程峰值 RSS 字节)"""
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Linux 上 ru_maxrss 单位为 KB，macOS 为字节
+    scale = 1 if sys.platform == "darwin" else 1024
+    cpu = usage.ru_utime + usage.ru_stime + children.ru_utime + children.ru_stime
+    return cpu, usage.ru_maxrss * scale, children.ru_maxrss * scale
+
+
+def _worker(args):
+    """在已配置好环境变量的子进程中运行并打印一行 JSON 结果"""
+    sys.path.insert(0, _ROOT)
+    import metrics
+    import cpu_backend
+    from fetcher import aget_all_news, aclose_client
+    from analyzer import analyze_news, is_llm_error
+
+    channels = [f"bench_{i}" for i in range(args.channels)]
+
+    async def run():
+        samples = []
+        try:
+            for _ in range(args.runs):
+                prompt_tokens = metrics.REGISTRY.total(
+                    "llm_tokens_total", kind="prompt"
+                )
+                started = time.perf_counter()
+                items = await aget_all_news(args.items, channels=channels)
+                fetched = time.perf_counter()
+                report, _ = await analyze_news(items)
+                finished = time.perf_counter()
+                samples.append(
+                    {
+                        "fetch": fetched - started,
+                        "analyze": finished - fetched,
+                        "total": finished - started,
+                        "items": len(items),
+                        "prompt_tokens": metrics.REGISTRY.total(
+                            "llm_tokens_total", kind="prompt"
+                        )
+                        - prompt_tokens,
+                        "error": is_llm_error(report),
+                    }
+                )
+        finally:
+            await aclose_client()
+            # 等待进程池退出，其 CPU 时间才会计入 RUSAGE_CHILDREN
+            cpu_backend.shutdown()
+        return samples
+
+    cpu_before, rss_before, _ = _usage()
+    samples = asyncio.run(run())
+    cpu_after, rss_peak, child_rss_peak = _usage()
+    result = {
+        "channels": args.channels,
+        "runs": args.runs,
+        "items_per_run": _stats([s["items"] for s in samples]),
+        "errors": sum(1 for s in samples if s["error"]),
+        "digest_seconds": _stats([s["total"] for s in samples]),
+        "fetch_seconds": _stats([s["fetch"] for s in samples]),
+        "analyze_seconds": _stats([s["analyze"] for s in samples]),
+        "prompt_tokens_per_run": [s["prompt_tokens"] for s in samples],
+        "cpu_seconds": cpu_after - cpu_before,
+        "cpu_seconds_per_run": (cpu_after - cpu_before) / max(1, args.runs),
+        "rss_before_mb": rss_before / 2**20,
+        "peak_rss_mb": rss_peak / 2**20,
+        "peak_worker_rss_mb": child_rss_peak / 2**20,
+    }
+    print(json.dumps(result))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"模拟服务未能在 {timeout}s 内启动：port={port}")
+
+
+def _spawn(script: str, port: int, extra):
+    cmd = [sys.executable, os.path.join(_HERE, script), "--port", str(port)] + extra
+    proc = subprocess.Popen(cmd)
+    _wait_port(port)
+    return proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抓取 + 分析流水线基准")
+    parser.add_argument("--scales", default="10,100,1000", help="频道数，逗号分隔")
+    parser.add_argument("--runs", type=int, default=5, help="每个规模运行的轮数")
+    parser.add_argument("--items", type=int, default=20, help="每个频道的条目数")
+    parser.add_argument("--rss-latency", type=float, default=0.02)
+    parser.add_argument("--rss-jitter", type=float, default=0.03)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--oversized-rate", type=float, default=0.0)
+    parser.add_argument("--feeds-dir", default="", help="录制的 feed 目录（<channel>.xml）")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0)
+    parser.add_argument(
+        "--cpu-backend", default="thread", help="CPU_BACKEND（thread/process）"
+    )
+    parser.add_argument("--cpu-workers", type=int, default=0, help="CPU_WORKERS")
+    parser.add_argument(
+        "--analysis-mode",
+        default="single",
+        help="LLM_ANALYSIS_MODE（single/mapreduce/hierarchical）",
+    )
+    parser.add_argument(
+        "--revalidate", action="store_true", help="启用 feed 缓存（TTL=0，条件请求）"
+    )
+    parser.add_argument("-o", "--output", help="结果 JSON 文件（默认输出到 stdout）")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--channels", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args)
+        return
+
+    rss_port, llm_port = _free_port(), _free_port()
+    servers = [
+        _spawn(
+            "fake_rsshub.py",
+            rss_port,
+            [
+                "--latency", str(args.rss_latency),
+                "--jitter", str(args.rss_jitter),
+                "--error-rate", str(args.error_rate),
+                "--oversized-rate", str(args.oversized_rate),
+                "--items", str(args.items),
+                "--feeds-dir", args.feeds_dir,
+            ],
+        ),
+        _spawn(
+            "fake_llm.py",
+            llm_port,
+            [
+                "--latency", str(args.llm_latency),
+                "--tokens-per-second", str(args.llm_tokens_per_second),
+            ],
+        ),
+    ]
+
+    results = []
+    try:
+        for scale in [int(x) for x in args.scales.split(",") if x.strip()]:
+            with tempfile.TemporaryDirectory() as data_dir:
+                env = dict(
+                    os.environ,
+                    RSSHUB_BASE_URL=f"http://127.0.0.1:{rss_port}",
+                    RSSHUB_FALLBACKS="",
+                    LLM_BASE_URL=f"http://127.0.0.1:{llm_port}",
+                    LLM_API_KEY="bench",
+                    DATA_DIR=data_dir,
+                    FEED_CACHE_ENABLED="1" if args.revalidate else "0",
+                    FEED_CACHE_TTL="0",
+                    LLM_CACHE_ENABLED="0",
+                    LLM_ANALYSIS_MODE=args.analysis_mode,
+                    CPU_BACKEND=args.cpu_backend,
+                    CPU_WORKERS=str(args.cpu_workers),
+                    # 只在进程内统计 LLM token 用量，不启动 /metrics 服务
+                    METRICS_ENABLED="1",
+                    METRICS_PORT="0",
+                    LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"),
+                )
+                cmd = [
+                    sys.executable,
+                    os.path.abspath(__file__),
+                    "--worker",
+                    "--channels", str(scale),
+                    "--runs", str(args.runs),
+                    "--items", str(args.items),
+                ]
+                print(f"running {scale} channels x {args.runs} runs...", file=sys.stderr)
+                out = subprocess.run(
+                    cmd, env=env, check=True, stdout=subprocess.PIPE, text=True
+                ).stdout
+                results.append(json.loads(out.strip().splitlines()[-1]))
+    finally:
+        for proc in servers:
+            proc.terminate()
+            proc.wait()
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            k: v
+            for k, v in vars(args).items()
+            if k not in ("worker", "channels", "output")
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
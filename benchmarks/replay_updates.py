@@ -0,0 +1,142 @@
+"""
+向本地运行的 webhook 模式 Bot（BOT_MODE=webhook）回放 Telegram Update：
+读取录制的 Update JSON，或按 --text 构造命令消息，带上 secret token POST 到 webhook 地址，
+输出每个请求的状态码与耗时。地址与 secret 默认取自 WEBHOOK_* 配置（.env）。
+
+录制文件可以是单个 Update、Update 列表、getUpdates 的原始响应（{"ok": true, "result": [...]}），
+或每行一个 Update 的 JSON Lines。
+
+用法：
+    python benchmarks/replay_updates.py --text "/list_subs" --text "/digest new"
+    python benchmarks/replay_updates.py updates.json --chat-id 123456   # 改写为该用户发送
+    python benchmarks/replay_updates.py updates.jsonl --repeat 20 --interval 0.1
+    python benchmarks/replay_updates.py --url http://127.0.0.1:8080/telegram --secret s --text /start
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+import httpx  # noqa: E402
+from config import (  # noqa: E402
+    CHAT_ID,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET_TOKEN,
+)
+
+_SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def _load_updates(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        # JSON Lines
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict) and "result" in data:
+        data = data["result"]
+    return data if isinstance(data, list) else [data]
+
+
+def _command_update(text: str, chat_id: int, message_id: int) -> dict:
+    """构造一条私聊文本消息；以 / 开头时标记为命令，CommandHandler 才会处理"""
+    message = {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "replay"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [
+            {"type": "bot_command", "offset": 0, "length": len(command)}
+        ]
+    return {"update_id": message_id, "message": message}
+
+
+def _rewrite_chat(update: dict, chat_id: int) -> dict:
+    """把录制的消息改写为 chat_id 发送（以便通过 Bot 的用户白名单）"""
+    for key in ("message", "edited_message", "channel_post"):
+        message = update.get(key)
+        if isinstance(message, dict):
+            message.setdefault("chat", {})["id"] = chat_id
+            if isinstance(message.get("from"), dict):
+                message["from"]["id"] = chat_id
+    return update
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向本地 webhook 回放 Telegram Update")
+    parser.add_argument("files", nargs="*", help="录制的 Update JSON / JSON Lines 文件")
+    parser.add_argument(
+        "--text", action="append", default=[], help="构造的消息文本，可重复"
+    )
+    parser.add_argument("--chat-id", help="发送者 chat id（默认 CHAT_ID）")
+    parser.add_argument("--url", help="webhook 地址（默认按 WEBHOOK_* 配置拼出本地地址）")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET_TOKEN, help="secret token")
+    parser.add_argument("--repeat", type=int, default=1, help="整组回放的次数")
+    parser.add_argument("--interval", type=float, default=0.0, help="请求间隔（秒）")
+    args = parser.parse_args()
+
+    if not args.secret:
+        parser.error("需要 --secret 或 WEBHOOK_SECRET_TOKEN（与运行中的 Bot 一致）")
+    chat_id = args.chat_id or CHAT_ID
+    if args.text and not chat_id:
+        parser.error("构造消息需要 --chat-id 或 CHAT_ID")
+    host = "127.0.0.1" if WEBHOOK_LISTEN in ("0.0.0.0", "::") else WEBHOOK_LISTEN
+    url = args.url or f"http://{host}:{WEBHOOK_PORT}/{WEBHOOK_PATH}"
+
+    recorded = [u for path in args.files for u in _load_updates(path)]
+    if args.chat_id:
+        recorded = [_rewrite_chat(u, int(args.chat_id)) for u in recorded]
+    if not recorded and not args.text:
+        parser.error("没有可回放的 Update：请指定文件或 --text")
+
+    # 构造的消息使用递增的 update_id / message_id，避免与录制的重复
+    ids = itertools.count(int(time.time()))
+    failures = 0
+    latencies = []
+    with httpx.Client(timeout=10, headers={_SECRET_HEADER: args.secret}) as client:
+        for _ in range(max(1, args.repeat)):
+            batch = recorded + [
+                _command_update(text, int(chat_id), next(ids)) for text in args.text
+            ]
+            for update in batch:
+                started = time.perf_counter()
+                try:
+                    resp = client.post(url, json=update)
+                    status = resp.status_code
+                except httpx.HTTPError as e:
+                    status = f"error: {e}"
+                elapsed = (time.perf_counter() - started) * 1000
+                latencies.append(elapsed)
+                if status != 200:
+                    failures += 1
+                print(f"update {update.get('update_id')}: {status} {elapsed:.1f}ms")
+                if args.interval:
+                    time.sleep(args.interval)
+
+    latencies.sort()
+    print(
+        f"{len(latencies)} updates, {failures} failed, "
+        f"p50 {latencies[len(latencies) // 2]:.1f}ms, max {latencies[-1]:.1f}ms"
+    )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
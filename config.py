@@ -1,8 +1,15 @@
 import os
 
+# 本地持久化数据目录（缓存、状态文件等）
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(__file__), "data"))
+
 # 从 Zeabur 的环境变量中读取
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHAT_ID = os.getenv("CHAT_ID")  # 你的个人 TG ID，确保 Bot 只给你发消息
+# 其他允许使用 Bot 的用户（逗号分隔的 chat id）：各自维护订阅并接收定时推送，CHAT_ID 始终允许
+ALLOWED_CHAT_IDS = [
+    x.strip() for x in os.getenv("ALLOWED_CHAT_IDS", "").split(",") if x.strip()
+]
 LLM_API_KEY = os.getenv("LLM_API_KEY")
 LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-5-nano")
@@ -11,6 +18,11 @@ DEFAULT_CHANNELS = [
     "wallstreetcn",
     "reuters_cn",
 ]
+# 其他用户的订阅文件目录（<chat_id>.json，首次使用时以 DEFAULT_CHANNELS 初始化）；
+# CHAT_ID 的订阅仍保存在项目目录下的 subscriptions.json
+SUBSCRIPTIONS_DIR = os.getenv(
+    "SUBSCRIPTIONS_DIR", os.path.join(DATA_DIR, "subscriptions")
+)
 
 # RSSHub 配置：可通过环境变量覆盖
 RSSHUB_BASE_URL = os.getenv("RSSHUB_BASE_URL", "https://rsshub.rssforever.com")
@@ -22,25 +34,144 @@ else:
     RSSHUB_FALLBACKS = []
 # RSSHub 请求超时（秒）
 RSSHUB_TIMEOUT = int(os.getenv("RSSHUB_TIMEOUT", "10"))
+# 并发抓取的频道数上限（异步抓取，连接池按此大小配置）
+RSSHUB_CONCURRENCY = int(os.getenv("RSSHUB_CONCURRENCY", "10"))
+# 单个实例遇到瞬时错误（5xx/连接错误）时原地重试的次数与退避基数（秒）；
+# 429 不原地重试，而是让该实例进入冷却并切换到下一个实例
+RSSHUB_RETRIES = int(os.getenv("RSSHUB_RETRIES", "3"))
+RSSHUB_RETRY_BACKOFF = float(os.getenv("RSSHUB_RETRY_BACKOFF", "0.6"))
+# 对冲请求：主实例在该延迟（秒）内未返回时并发请求下一个实例，取最先成功的结果
+# 留空或 0 表示顺序回退；设为 "p95" 时按近期成功请求耗时的 p95 自适应
+RSSHUB_HEDGE_DELAY = os.getenv("RSSHUB_HEDGE_DELAY", "").strip().lower()
+# p95 模式下的最小延迟，以及样本不足时使用的延迟（秒）
+RSSHUB_HEDGE_MIN_DELAY = float(os.getenv("RSSHUB_HEDGE_MIN_DELAY", "0.5"))
+RSSHUB_HEDGE_DEFAULT_DELAY = float(os.getenv("RSSHUB_HEDGE_DEFAULT_DELAY", "2"))
+# RSSHub 实例健康度：连续失败多少次熔断、熔断时长（秒）、429 默认冷却时长（秒）
+RSSHUB_BREAKER_THRESHOLD = int(os.getenv("RSSHUB_BREAKER_THRESHOLD", "5"))
+RSSHUB_BREAKER_SECONDS = int(os.getenv("RSSHUB_BREAKER_SECONDS", "300"))
+RSSHUB_COOLDOWN_SECONDS = int(os.getenv("RSSHUB_COOLDOWN_SECONDS", "60"))
+RSSHUB_HEALTH_FILE = os.getenv(
+    "RSSHUB_HEALTH_FILE", os.path.join(DATA_DIR, "rsshub_health.json")
+)
+# feed 缓存：TTL（秒）内重复抓取直接复用缓存，过期后使用 ETag/Last-Modified 条件请求
+FEED_CACHE_ENABLED = os.getenv("FEED_CACHE_ENABLED", "1") == "1"
+FEED_CACHE_TTL = int(os.getenv("FEED_CACHE_TTL", "300"))
+FEED_CACHE_FILE = os.getenv("FEED_CACHE_FILE", os.path.join(DATA_DIR, "feed_cache.json"))
 # 每个频道抓取的条数
 RSS_ITEMS_PER_CHANNEL = int(os.getenv("RSS_ITEMS_PER_CHANNEL", "20"))
+# 流式解析 feed：边下载边解析，读满所需条数即停止；XML 格式错误时回退到 feedparser
+RSS_STREAMING_PARSER = os.getenv("RSS_STREAMING_PARSER", "1") == "1"
+# 流式解析时单条摘要保留的最大字符数（含 HTML 标记），以及单个 feed 最多读取的字节数
+RSS_MAX_ENTRY_CHARS = int(os.getenv("RSS_MAX_ENTRY_CHARS", "20000"))
+RSS_MAX_FEED_BYTES = int(os.getenv("RSS_MAX_FEED_BYTES", str(8 * 1024 * 1024)))
+# CPU 密集工作（feed 解析、HTML 清理、去重签名）的执行方式：
+# thread（事件循环与线程池，默认）或 process（进程池分块处理，可用满多核）
+CPU_BACKEND = os.getenv("CPU_BACKEND", "thread").strip().lower()
+# 进程池大小（0 表示 CPU 核数），以及去重签名每个任务的条目数
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", "0"))
+CPU_CHUNK_SIZE = int(os.getenv("CPU_CHUNK_SIZE", "200"))
+
+# 增量简报：默认只分析上次简报之后的新条目（/digest new 与 /digest all 可临时切换）
+DIGEST_SINCE_LAST = os.getenv("DIGEST_SINCE_LAST", "0") == "1"
+# 已进入简报的条目记录（SQLite）及保留天数
+SEEN_STORE_FILE = os.getenv("SEEN_STORE_FILE", os.path.join(DATA_DIR, "seen.sqlite3"))
+SEEN_RETENTION_DAYS = int(os.getenv("SEEN_RETENTION_DAYS", "30"))
+# 后台简报：每隔多少秒预先刷新并生成简报（0 表示关闭），/digest all 直接使用不超过 DIGEST_MAX_AGE 秒的结果
+DIGEST_REFRESH_INTERVAL = float(os.getenv("DIGEST_REFRESH_INTERVAL", "0"))
+DIGEST_MAX_AGE = float(os.getenv("DIGEST_MAX_AGE", "1800"))
+# 每日定时推送到 CHAT_ID 的时间，逗号分隔的 HH:MM（如 "08:00,20:00"），留空表示不推送
+DIGEST_PUSH_TIMES = os.getenv("DIGEST_PUSH_TIMES", "")
+# 推送时间所用时区（如 "Asia/Shanghai"），留空按服务器本地时区
+DIGEST_TIMEZONE = os.getenv("DIGEST_TIMEZONE", "")
 
 # LLM 分析配置
 # 每篇文章的最大字符数（防止单篇过长挤占上下文）
 ARTICLE_MAX_CHARS = int(os.getenv("ARTICLE_MAX_CHARS", "900"))
-# 估算的 LLM 上下文限制（字符数，1 token ≈ 4 字符）
-# GPT-5 mini: 400k context window -> 1,600,000 chars
+# 旧的字符数配置（按 1 token ≈ 4 字符换算），仅在未设置下方 token 配置时作为默认值
 LLM_CONTEXT_LIMIT = int(os.getenv("LLM_CONTEXT_LIMIT", "1600000"))
-# 预留给输出的字符数（completion）
-# GPT-5 mini: 128k max output -> 512,000 chars
 LLM_COMPLETION_LIMIT = int(os.getenv("LLM_COMPLETION_LIMIT", "512000"))
+# LLM 上下文窗口与预留给输出的 token 数
+# GPT-5 mini: 400k context window, 128k max output
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", str(LLM_CONTEXT_LIMIT // 4)))
+LLM_COMPLETION_TOKENS = int(
+    os.getenv("LLM_COMPLETION_TOKENS", str(LLM_COMPLETION_LIMIT // 4))
+)
+# 输入预算的安全余量（比例），吸收 token 估算误差
+LLM_TOKEN_SAFETY_MARGIN = float(os.getenv("LLM_TOKEN_SAFETY_MARGIN", "0.05"))
+# token 计数：heuristic（离线估算）或 tiktoken（精确计算，需安装 tiktoken 并缓存编码文件）
+TOKENIZER = os.getenv("TOKENIZER", "heuristic").strip().lower()
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+# 估算系数（每字符 token 数）：中日韩字符、ASCII 字符、其他字符；默认值偏保守
+TOKEN_CJK_PER_CHAR = float(os.getenv("TOKEN_CJK_PER_CHAR", "1.0"))
+TOKEN_ASCII_PER_CHAR = float(os.getenv("TOKEN_ASCII_PER_CHAR", "0.3"))
+TOKEN_OTHER_PER_CHAR = float(os.getenv("TOKEN_OTHER_PER_CHAR", "0.5"))
+# 跨频道近重复合并（与簇代表条目的 Jaccard 相似度阈值，频道模板短句不计入）
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.5"))
+# 超出输入预算时的裁剪方式：rank（按重要度选取整条或轻度裁剪的条目）、proportional（所有条目等比例缩短）
+LLM_TRUNCATE_MODE = os.getenv("LLM_TRUNCATE_MODE", "rank").strip().lower()
+# 重要度排序：时效半衰期（小时），以及频道权重 "channel:weight,channel:weight"（未列出的为 1）
+RANK_HALF_LIFE_HOURS = float(os.getenv("RANK_HALF_LIFE_HOURS", "12"))
+CHANNEL_WEIGHTS = os.getenv("CHANNEL_WEIGHTS", "")
 # LLM 调用参数
 LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "40000"))
 LLM_CONTINUATION_MAX_TOKENS = int(os.getenv("LLM_CONTINUATION_MAX_TOKENS", "128000"))
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.4"))
+# 分析模式：single（单次完整 prompt）、mapreduce（输入超过一个批次时分批并行摘要后合并）、
+# hierarchical（每条/每个事件先生成短摘要并按内容哈希持久缓存，最终 top-10 基于摘要生成）
+LLM_ANALYSIS_MODE = os.getenv("LLM_ANALYSIS_MODE", "single").strip().lower()
+# mapreduce 模式下每个批次的最大 token 数，以及每个批次摘要的 max_tokens
+LLM_MAPREDUCE_BATCH_TOKENS = int(os.getenv("LLM_MAPREDUCE_BATCH_TOKENS", "20000"))
+LLM_MAP_MAX_TOKENS = int(os.getenv("LLM_MAP_MAX_TOKENS", "4000"))
+# hierarchical 模式：每次摘要请求的最大输入 token 数与 max_tokens，单条摘要的最大字符数
+LLM_SUMMARY_BATCH_TOKENS = int(os.getenv("LLM_SUMMARY_BATCH_TOKENS", "6000"))
+LLM_SUMMARY_MAX_TOKENS = int(os.getenv("LLM_SUMMARY_MAX_TOKENS", "3000"))
+LLM_SUMMARY_MAX_CHARS = int(os.getenv("LLM_SUMMARY_MAX_CHARS", "160"))
+# 条目摘要缓存（SQLite）及未使用摘要的保留天数
+SUMMARY_CACHE_FILE = os.getenv(
+    "SUMMARY_CACHE_FILE", os.path.join(DATA_DIR, "summary_cache.sqlite3")
+)
+SUMMARY_CACHE_RETENTION_DAYS = int(os.getenv("SUMMARY_CACHE_RETENTION_DAYS", "7"))
+# 流式输出：边生成边编辑 Telegram 消息，缩短首次看到内容的时间
+LLM_STREAM = os.getenv("LLM_STREAM", "0") == "1"
+# LLM 响应缓存：相同模型/参数/prompt 的请求在 TTL（秒）内直接复用结果
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+LLM_CACHE_FILE = os.getenv("LLM_CACHE_FILE", os.path.join(DATA_DIR, "llm_cache.sqlite3"))
 # 线程池并发（LLM 调用）
 LLM_THREADPOOL_WORKERS = int(os.getenv("LLM_THREADPOOL_WORKERS", "3"))
 # LLM 请求超时与重试
 LLM_TIMEOUT = int(os.getenv("LLM_TIMEOUT", "120"))
 LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
 LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "1.5"))
+# 遵循服务端 Retry-After 时的最长等待（秒）
+LLM_MAX_RETRY_AFTER = float(os.getenv("LLM_MAX_RETRY_AFTER", "60"))
+# 客户端限速（令牌桶）：每秒请求数（0 表示不限速）与突发上限
+LLM_RATE_LIMIT_RPS = float(os.getenv("LLM_RATE_LIMIT_RPS", "0"))
+LLM_RATE_LIMIT_BURST = int(
+    os.getenv("LLM_RATE_LIMIT_BURST", str(LLM_THREADPOOL_WORKERS))
+)
+
+# Telegram 消息输出
+# 单条消息的最大长度，以及流式输出时两次编辑消息的最小间隔（秒）
+TELEGRAM_MESSAGE_LIMIT = int(os.getenv("TELEGRAM_MESSAGE_LIMIT", "4096"))
+TELEGRAM_EDIT_INTERVAL = float(os.getenv("TELEGRAM_EDIT_INTERVAL", "1.5"))
+
+# 接收更新的方式：polling（默认，长轮询 getUpdates）或 webhook（本地 HTTP 服务，适合放在反向代理后）
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# webhook 模式：本地监听地址与端口，以及接收更新的路径
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", os.getenv("PORT", "8080")))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram").strip("/")
+# 对外的 HTTPS 地址（反向代理的域名，如 https://bot.example.com），注册为 <WEBHOOK_URL>/<WEBHOOK_PATH>
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+# Telegram 在每个请求的 X-Telegram-Bot-Api-Secret-Token 头中带上该值，不匹配的请求被拒绝；
+# 留空时每次启动随机生成（本地回放更新时需显式设置）
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN", "")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+# 运行指标：启用后在 METRICS_HOST:METRICS_PORT 提供 Prometheus 格式的 /metrics（端口 0 表示只用 /stats 查看）
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
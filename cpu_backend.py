@@ -0,0 +1,146 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+from xml.etree.ElementTree import ParseError
+import feedparser
+from dedup import Signature, signatures as _signatures
+from feed_parser import StreamingFeedParser
+from normalize import normalize_entry
+from logger import get_logger, report_error
+from config import CPU_BACKEND, CPU_WORKERS, CPU_CHUNK_SIZE
+
+logger = get_logger(__name__)
+
+# 是否把解析、HTML 清理与去重签名交给进程池（网络 I/O 始终留在事件循环中）
+PROCESS = CPU_BACKEND == "process"
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def parse_feed_rows(
+    body: bytes, limit: int, max_entry_chars: int, truncated: bool, streaming: bool
+) -> Tuple[List[tuple], int, bool, Optional[str]]:
+    """
+    在工作进程中解析 feed 并清理条目，返回 (rows, entries, complete, bozo)。
+    rows 为 normalize_entry 的元组，bozo 为 feedparser 报告的格式问题（没有时为 None）。
+    truncated 表示响应未读完（读满条目或达到大小上限后提前停止）。
+    """
+    feed = None
+    if streaming:
+        parser = StreamingFeedParser(limit, max_entry_chars)
+        try:
+            parser.feed(body)
+            feed = parser.close(truncated)
+            complete = feed.complete
+        except ParseError:
+            feed = None
+    if feed is None:
+        # XML 不规范：交给容错的 feedparser（提前停止时只能解析已读到的部分）
+        feed = feedparser.parse(body)
+        complete = not truncated and len(feed.entries) <= limit
+    bozo = None
+    if getattr(feed, "bozo", False) and getattr(feed, "bozo_exception", None):
+        bozo = str(feed.bozo_exception)
+    rows = [normalize_entry(entry) for entry in feed.entries[:limit]]
+    return rows, len(feed.entries), complete, bozo
+
+
+def signature_rows(
+    texts: List[Tuple[Optional[str], str, str]],
+) -> List[Optional[Signature]]:
+    """在工作进程中计算一块 (频道, 标题, 内容) 的去重签名"""
+    return _signatures([{"source": s, "title": t, "content": c} for s, t, c in texts])
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            methods = multiprocessing.get_all_start_methods()
+            if "forkserver" in methods:
+                # 工作进程从预加载了本模块的 forkserver 派生，不继承主进程的线程；
+                # 但每个工作进程仍会以 __mp_main__ 重新导入启动脚本（main.py），
+                # 其模块级代码（导入 fetcher/analyzer、读取配置与缓存文件）会再执行一次
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(["cpu_backend"])
+            else:
+                context = multiprocessing.get_context("spawn")
+            workers = CPU_WORKERS or os.cpu_count() or 1
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            logger.info("CPU 进程池已启动：%d 个进程", workers)
+        return _POOL
+
+
+def _reset_pool(wait: bool = False):
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+async def run(func, *args):
+    """
+    执行 CPU 密集的 func(*args)：process 模式提交到进程池，否则在默认线程池中执行。
+    进程池异常退出时记录错误、下次重建，本次改在线程中执行。
+    """
+    loop = asyncio.get_running_loop()
+    if PROCESS:
+        try:
+            return await loop.run_in_executor(_get_pool(), func, *args)
+        except BrokenProcessPool as e:
+            logger.exception("CPU 进程池异常，本次改在线程中执行：%s", func.__name__)
+            report_error(e, {"component": "cpu_backend", "task": func.__name__})
+            _reset_pool()
+    return await loop.run_in_executor(None, func, *args)
+
+
+async def signatures(items: List[dict]) -> Optional[List[Optional[Signature]]]:
+    """
+    process 模式下分块并行计算去重签名（只传频道、标题与内容），与 items 一一对应；
+    同一频道的条目分在同一块中，以便识别频道模板短句。
+    thread 模式返回 None，由 dedup_news 自行计算。
+    """
+    if not PROCESS or not items:
+        return None
+    by_source = {}
+    for idx, it in enumerate(items):
+        by_source.setdefault(it.get("source"), []).append(idx)
+    size = max(1, CPU_CHUNK_SIZE)
+    # 按频道装块：一块凑满 size 条后另起一块，单个频道不拆开
+    chunks = [[]]
+    for indices in by_source.values():
+        if chunks[-1] and len(chunks[-1]) + len(indices) > size:
+            chunks.append([])
+        chunks[-1].extend(indices)
+    results = await asyncio.gather(
+        *(
+            run(
+                signature_rows,
+                [
+                    (
+                        items[i].get("source"),
+                        items[i].get("title", "") or "",
+                        items[i].get("content", "") or "",
+                    )
+                    for i in chunk
+                ],
+            )
+            for chunk in chunks
+        )
+    )
+    sigs = [None] * len(items)
+    for chunk, chunk_sigs in zip(chunks, results):
+        for i, sig in zip(chunk, chunk_sigs):
+            sigs[i] = sig
+    return sigs
+
+
+def shutdown():
+    """关闭进程池（Bot 退出时调用）"""
+    _reset_pool(wait=True)
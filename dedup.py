@@ -0,0 +1,254 @@
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# 参与签名计算的最大字符数（近重复判断只需开头部分）
+_MAX_TEXT_CHARS = 600
+# 少于该数量 shingle 的短文本签名不可靠，只做链接精确去重
+_MIN_SHINGLES = 8
+# MinHash 签名长度（单次排列哈希的分桶数）与 LSH 分段：_BANDS 段，每段 _ROWS 个值
+_NUM_BINS = 64
+_ROWS = 2
+_BANDS = _NUM_BINS // _ROWS
+# 每个 LSH 桶内最多比较的簇数，保证最坏情况下仍为线性
+_MAX_BUCKET_COMPARE = 32
+# 每个条目最多精确核对的候选簇数
+_MAX_CANDIDATES = 8
+# 频道模板：同一频道至少这么多条、且过半条目都含有的短句（开头标签、订阅/投稿提示等）
+# 是固定格式而非新闻内容，计算签名前去掉
+_TEMPLATE_MIN_ITEMS = 3
+_TEMPLATE_RATIO = 0.5
+# 空桶占位值（大于任何 64 位哈希）
+_EMPTY = 1 << 64
+_MASK64 = (1 << 64) - 1
+# multiply-shift 哈希的固定奇数乘子（确定性，跨进程结果一致；内置 hash() 按进程加盐）
+_MULT = 0x9E3779B97F4A7C15F39CC0605CEDC835
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_URL_RE = re.compile(r"https?://\S+")
+# 去掉空白与标点，只保留文字与数字
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+# 按标点与换行切成短句（模板句常与正文以逗号相连，如“……，关注我们获取更多快讯”）
+_CLAUSE_RE = re.compile(r"[。！？!?；;，,、：:\n]+")
+_NUMBER_RE = re.compile(r"\d+")
+
+Signature = Tuple[int, ...]
+
+
+def _clauses(item: dict) -> List[str]:
+    """标题与内容切成短句后规范化：去掉标签、链接、空白与标点，只保留文字与数字"""
+    text = f"{item.get('title', '')}\n{item.get('content', '')}"
+    text = _URL_RE.sub(" ", _TAG_RE.sub(" ", text)).lower()
+    clauses = (_NON_WORD_RE.sub("", s) for s in _CLAUSE_RE.split(text))
+    return [s for s in clauses if s]
+
+
+def _template_clauses(items: List[dict]) -> Dict[Optional[str], Set[str]]:
+    """
+    各频道的固定格式短句：同一频道过半条目都出现的短句。
+    不去掉的话，同一模板下的不同新闻会因为模板本身而显得近重复。
+    """
+    per_source: Dict[Optional[str], List[dict]] = {}
+    for item in items:
+        per_source.setdefault(item.get("source"), []).append(item)
+    templates = {}
+    for source, group in per_source.items():
+        if len(group) < _TEMPLATE_MIN_ITEMS:
+            continue
+        counts = Counter(s for item in group for s in set(_clauses(item)))
+        common = {s for s, n in counts.items() if n >= len(group) * _TEMPLATE_RATIO}
+        if common:
+            templates[source] = common
+    return templates
+
+
+def _normalize_text(item: dict, template: Iterable[str] = ()) -> str:
+    return "".join(s for s in _clauses(item) if s not in template)
+
+
+def _shingles(text: str) -> Set[int]:
+    """
+    前 _MAX_TEXT_CHARS 个字符的 3 字符 shingle；
+    Unicode 码位不超过 21 位，3 个码位可无损拼成一个 63 位整数
+    """
+    codes = list(map(ord, text[:_MAX_TEXT_CHARS]))
+    return {a << 42 | b << 21 | c for a, b, c in zip(codes, codes[1:], codes[2:])}
+
+
+def minhash_signature(text: str) -> Optional[Signature]:
+    """
+    单次排列 MinHash（one permutation hashing）：每个 3 字符 shingle 只做一次
+    multiply-shift 哈希，按哈希值分到 _NUM_BINS 个桶并保留桶内最小值。
+    文本过短时返回 None。
+    """
+    hashes = {(s * _MULT) >> 64 & _MASK64 for s in _shingles(text)}
+    if len(hashes) < _MIN_SHINGLES:
+        return None
+    sig = [_EMPTY] * _NUM_BINS
+    for h in hashes:
+        b = h % _NUM_BINS
+        if h < sig[b]:
+            sig[b] = h
+    return tuple(sig)
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """由签名估计 Jaccard 相似度（忽略两边都为空的桶）"""
+    match = 0
+    total = 0
+    for x, y in zip(a, b):
+        if x == _EMPTY and y == _EMPTY:
+            continue
+        total += 1
+        if x == y:
+            match += 1
+    return match / total if total else 0.0
+
+
+def signatures(items: List[dict]) -> List[Optional[Signature]]:
+    """
+    逐条计算签名；同一频道的条目需在同一次调用中传入，才能识别并去掉频道模板短句
+    """
+    templates = _template_clauses(items)
+    return [
+        minhash_signature(_normalize_text(item, templates.get(item.get("source"), ())))
+        for item in items
+    ]
+
+
+def _merge(group: List[dict]) -> dict:
+    """合并一组近重复条目：保留内容最长的一条，并保留所有来源与链接"""
+    if len(group) == 1:
+        return group[0]
+    rep = max(group, key=lambda it: len(it.get("content") or ""))
+    sources = []
+    seen = set()
+    for it in group:
+        for src in it.get("sources") or [
+            {"source": it.get("source", ""), "link": it.get("link", "")}
+        ]:
+            key = (src.get("source", ""), src.get("link", ""))
+            if key not in seen:
+                seen.add(key)
+                sources.append(dict(src))
+    merged = dict(rep)
+    merged["sources"] = sources
+    names = []
+    for src in sources:
+        if src["source"] and src["source"] not in names:
+            names.append(src["source"])
+    merged["source"] = ", ".join(names)
+    return merged
+
+
+def dedup_news(
+    items: List[dict],
+    threshold: float = 0.5,
+    sigs: Optional[List[Optional[Signature]]] = None,
+) -> List[dict]:
+    """
+    跨频道近重复检测：基于标题+内容（去掉频道模板短句）的 3 字符 shingle（适用于中文）
+    计算 MinHash 签名，经 LSH 分段找出候选簇；条目与簇的代表条目（簇内第一条）的
+    Jaccard 相似度不低于 threshold 时并入该簇，链接相同的条目直接合并。
+    合并后的条目在 "sources" 中保留所有来源链接。
+
+    短文本的签名估计误差较大，签名只用于筛选候选，是否合并按 shingle 集合的精确
+    Jaccard 相似度判断（只对候选计算，两个频道的模板短句都去掉）；两条都含数字时，
+    较少一方过半的数字须在另一方出现。
+
+    只与代表条目比较，不会出现 A~B、B~C 把 A 与 C 串成一簇的传递合并；
+    同一频道的条目不会进入同一簇（频道内相似多为固定格式）。
+    时间复杂度与条目数线性相关。sigs 可传入预先计算好的签名（与 items 一一对应）。
+    """
+    if len(items) < 2:
+        return list(items)
+
+    if sigs is None:
+        sigs = signatures(items)
+    templates = _template_clauses(items)
+    # 只为候选条目计算：(规范化短句, 正文中的数字)
+    features = {}
+
+    def feature(k: int):
+        if k not in features:
+            item = items[k]
+            # 标题多为正文开头的截断，截断处的半个数字不参与比较
+            body = _URL_RE.sub(" ", _TAG_RE.sub(" ", item.get("content") or ""))
+            numbers = _NUMBER_RE.findall(body or item.get("title") or "")
+            features[k] = (_clauses(item), frozenset(numbers))
+        return features[k]
+
+    def numbers_match(i: int, j: int) -> bool:
+        # 两边都有数字时，较少一方过半的数字须在另一方出现：转发时增删日期不受影响，
+        # 同一模板下金额、编号不同的事件不合并
+        nums_a, nums_b = feature(i)[1], feature(j)[1]
+        if nums_a and nums_b:
+            return len(nums_a & nums_b) * 2 > min(len(nums_a), len(nums_b))
+        return True
+
+    def score(i: int, j: int) -> float:
+        # 两个频道的模板短句都去掉，避免一边去掉、另一边保留同一句话
+        template = templates.get(items[i].get("source"), frozenset()) | templates.get(
+            items[j].get("source"), frozenset()
+        )
+        a, b = (
+            _shingles("".join(c for c in feature(k)[0] if c not in template))
+            for k in (i, j)
+        )
+        return len(a & b) / len(a | b) if a or b else 0.0
+
+    # 每个簇：代表条目下标、成员下标、已包含的频道
+    clusters: List[Tuple[int, List[int], set]] = []
+    buckets = {}
+    by_link = {}
+
+    for idx, (item, sig) in enumerate(zip(items, sigs)):
+        source = item.get("source")
+        link = item.get("link")
+        target = by_link.get(link) if link else None
+        keys = []
+        if sig is not None:
+            keys = [
+                (band,) + sig[band * _ROWS : (band + 1) * _ROWS]
+                for band in range(_BANDS)
+            ]
+
+        if target is None:
+            # 共享 LSH 段越多的簇越相似，只核对命中段数最多的几个
+            hits = Counter()
+            for key in keys:
+                hits.update(buckets.get(key, ())[-_MAX_BUCKET_COMPARE:])
+            best = 0.0
+            checked = 0
+            for cid, _ in hits.most_common():
+                rep, _, cluster_sources = clusters[cid]
+                if source in cluster_sources or not numbers_match(idx, rep):
+                    continue
+                checked += 1
+                if checked > _MAX_CANDIDATES:
+                    break
+                # 估计值留足余量，只排除明显不相似的候选
+                if similarity(sig, sigs[rep]) < threshold / 2:
+                    continue
+                value = score(idx, rep)
+                if value >= threshold and value > best:
+                    best, target = value, cid
+
+        if target is None:
+            target = len(clusters)
+            clusters.append((idx, [], set()))
+            # 桶中只登记代表条目，后来的条目只与代表比较
+            for key in keys:
+                buckets.setdefault(key, []).append(target)
+        clusters[target][1].append(idx)
+        clusters[target][2].add(source)
+        if link:
+            by_link.setdefault(link, target)
+
+    result = [_merge([items[i] for i in members]) for _, members, _ in clusters]
+    if len(result) < len(items):
+        logger.info("近重复合并：%d 条 -> %d 条", len(items), len(result))
+    return result
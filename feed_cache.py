@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import threading
+from typing import List, Optional
+from logger import get_logger, report_error
+
+logger = get_logger(__name__)
+
+# 超过该时长未被使用的缓存项在保存时清理（秒）
+_MAX_IDLE_SECONDS = 7 * 24 * 3600
+# 缓存条目的结构版本；条目格式变化（如正文清洗）时递增，旧版本的缓存不再复用
+_FORMAT = 2
+
+
+class FeedCache:
+    """
+    以 RSSHub URL 为 key 的持久化 feed 缓存。
+
+    每项保存 ETag / Last-Modified 校验信息与解析后的条目，用于：
+    - TTL 内直接复用（完全跳过网络请求）
+    - 条件请求（If-None-Match / If-Modified-Since），304 时复用已解析条目
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = None
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if self._data is not None:
+            return self._data
+        data = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if not isinstance(data, dict):
+                    data = {}
+            except Exception as e:
+                logger.exception("加载 feed 缓存失败：%s", self.path)
+                report_error(e, {"file": self.path})
+                data = {}
+        self._data = data
+        return data
+
+    @staticmethod
+    def _usable(entry: dict, limit: int) -> bool:
+        # 缓存的条目数不足本次 limit 时（且 feed 本身还有更多条目）不能复用
+        if entry.get("format") != _FORMAT:
+            return False
+        return entry.get("complete") or len(entry.get("items", [])) >= limit
+
+    def fresh_items(self, urls: List[str], limit: int) -> Optional[List[dict]]:
+        """在 TTL 内返回任一实例下最新的缓存条目，否则返回 None"""
+        if self.ttl <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            data = self._load()
+            best = None
+            for url in urls:
+                entry = data.get(url)
+                if not entry or not self._usable(entry, limit):
+                    continue
+                if now - entry.get("checked_at", 0) > self.ttl:
+                    continue
+                if best is None or entry["checked_at"] > best["checked_at"]:
+                    best = entry
+            if best is None:
+                return None
+            return [dict(x) for x in best["items"][:limit]]
+
+    def validators(self, url: str, limit: int) -> dict:
+        """返回条件请求头；缓存不可用于本次 limit 时返回空字典"""
+        with self._lock:
+            entry = self._load().get(url)
+            if not entry or not self._usable(entry, limit):
+                return {}
+            headers = {}
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+            return headers
+
+    def revalidated(self, url: str, limit: int) -> Optional[List[dict]]:
+        """处理 304：刷新检查时间并返回缓存条目"""
+        with self._lock:
+            entry = self._load().get(url)
+            if not entry or not self._usable(entry, limit):
+                return None
+            entry["checked_at"] = time.time()
+            self._dirty = True
+            return [dict(x) for x in entry["items"][:limit]]
+
+    def put(
+        self,
+        url: str,
+        items: List[dict],
+        complete: bool,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        with self._lock:
+            self._load()[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "checked_at": time.time(),
+                "complete": complete,
+                "items": items,
+                "format": _FORMAT,
+            }
+            self._dirty = True
+
+    def save(self):
+        """原子写入磁盘（临时文件 + rename），仅在有变更时写入"""
+        with self._lock:
+            if not self._dirty or self._data is None:
+                return
+            cutoff = time.time() - _MAX_IDLE_SECONDS
+            data = {
+                k: v for k, v in self._data.items() if v.get("checked_at", 0) >= cutoff
+            }
+            self._data = data
+            tmp_path = f"{self.path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                logger.exception("保存 feed 缓存失败：%s", self.path)
+                report_error(e, {"file": self.path})
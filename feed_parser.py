@@ -0,0 +1,161 @@
+from typing import List, Optional
+from xml.etree.ElementTree import XMLParser
+
+# 条目容器元素（RSS 2.0 / RSS 1.0 为 item，Atom 为 entry）
+_ENTRY_TAGS = ("item", "entry")
+
+# 条目字段 -> 输出字段；同一输出字段有多个来源时按出现顺序取第一个非空值
+_FIELD_MAP = {
+    "title": "title",
+    "description": "summary",
+    "summary": "summary",
+    "encoded": "content",  # content:encoded
+    "content": "content",  # Atom content
+    "link": "link",
+    "guid": "id",
+    "id": "id",
+    "pubDate": "published",
+    "published": "published",
+    "date": "published",  # dc:date
+    "updated": "updated",
+}
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class ParsedFeed:
+    """解析结果，字段与 feedparser 结果中用到的部分一致"""
+
+    def __init__(
+        self,
+        entries: List[dict],
+        complete: bool,
+        bozo: bool = False,
+        bozo_exception: Optional[Exception] = None,
+    ):
+        self.entries = entries
+        # True 表示已读到 feed 末尾（没有更多条目）
+        self.complete = complete
+        self.bozo = bozo
+        self.bozo_exception = bozo_exception
+
+
+class _Target:
+    """expat 解析回调：只收集条目中用到的字段，每个字段的文本有长度上限"""
+
+    def __init__(self, limit: int, max_summary_chars: int, max_field_chars: int):
+        self.limit = limit
+        self.max_summary_chars = max_summary_chars
+        self.max_field_chars = max_field_chars
+        self.entries = []
+        self.done = False
+        self._depth = 0
+        self._entry = None
+        self._entry_depth = 0
+        self._field = None
+        self._parts = []
+        self._size = 0
+        self._cap = 0
+
+    def start(self, tag, attrib):
+        self._depth += 1
+        name = _local(tag)
+        if self._entry is None:
+            if name in _ENTRY_TAGS:
+                self._entry = {}
+                self._entry_depth = self._depth
+            return
+        if self._depth != self._entry_depth + 1:
+            return
+        field = _FIELD_MAP.get(name)
+        if field is None:
+            return
+        if field == "link" and "href" in attrib:
+            # Atom：<link rel="alternate" href="..."/>
+            if attrib.get("rel", "alternate") == "alternate":
+                self._entry.setdefault("link", attrib["href"])
+            return
+        self._field = field
+        self._parts = []
+        self._size = 0
+        self._cap = (
+            self.max_summary_chars
+            if field in ("summary", "content")
+            else self.max_field_chars
+        )
+
+    def data(self, text):
+        if self._field is None or self._size >= self._cap:
+            return
+        text = text[: self._cap - self._size]
+        self._parts.append(text)
+        self._size += len(text)
+
+    def end(self, tag):
+        depth = self._depth
+        self._depth -= 1
+        if self._entry is None:
+            return
+        if depth == self._entry_depth:
+            self._finish_entry()
+            return
+        if self._field is not None and depth == self._entry_depth + 1:
+            value = "".join(self._parts).strip()
+            if value and not self._entry.get(self._field):
+                self._entry[self._field] = value
+            self._field = None
+            self._parts = []
+
+    def _finish_entry(self):
+        entry = self._entry
+        self._entry = None
+        # 与 feedparser 一致：RSS 用 description 作为 summary，Atom 无 summary 时取 content
+        if not entry.get("summary") and entry.get("content"):
+            entry["summary"] = entry["content"]
+        entry.pop("content", None)
+        updated = entry.pop("updated", None)
+        if not entry.get("published") and updated:
+            entry["published"] = updated
+        self.entries.append(entry)
+        if len(self.entries) >= self.limit:
+            self.done = True
+
+    def close(self):
+        return None
+
+
+class StreamingFeedParser:
+    """
+    增量解析 RSS/Atom：按块喂入字节，读满 limit 个条目后即可停止读取响应。
+    只保留 title/summary/link/id/published，单个字段的文本超过上限的部分直接丢弃，
+    因此内存与解析耗时与 feed 的总大小无关。
+    """
+
+    def __init__(self, limit: int, max_summary_chars: int, max_field_chars: int = 2048):
+        self._target = _Target(max(1, limit), max_summary_chars, max_field_chars)
+        self._parser = XMLParser(target=self._target)
+        self._closed = False
+
+    @property
+    def done(self) -> bool:
+        """已读满 limit 个条目"""
+        return self._target.done
+
+    def feed(self, data: bytes):
+        """喂入一块数据；XML 格式错误时抛出 ParseError"""
+        if not self._target.done:
+            self._parser.feed(data)
+
+    def close(self, truncated: bool = False) -> ParsedFeed:
+        """
+        结束解析并返回结果；truncated 表示因大小上限提前停止读取。
+        既未读满 limit 也未提前停止时视为已读到 feed 末尾。
+        """
+        complete = False
+        if not self._target.done and not truncated and not self._closed:
+            self._parser.close()
+            complete = True
+        self._closed = True
+        return ParsedFeed(self._target.entries[: self._target.limit], complete)
@@ -1,221 +1,731 @@
 import feedparser
 import os
-import json
-from typing import List
-import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from requests.exceptions import SSLError
+import ssl
+import time
+import asyncio
+import weakref
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from xml.etree.ElementTree import ParseError
+import httpx
+import metrics
+import cpu_backend
 from logger import get_logger, report_error
+from feed_cache import FeedCache
+from feed_parser import StreamingFeedParser
+from normalize import ENTRY_FIELDS, normalize_entry
+from rsshub_health import HealthTracker
+from subscriptions import SubscriptionRegistry
+from http_utils import parse_retry_after
 from config import (
     RSSHUB_BASE_URL,
     RSSHUB_FALLBACKS,
     RSSHUB_TIMEOUT,
+    RSSHUB_CONCURRENCY,
+    RSSHUB_RETRIES,
+    RSSHUB_RETRY_BACKOFF,
+    RSSHUB_HEDGE_DELAY,
+    RSSHUB_HEDGE_MIN_DELAY,
+    RSSHUB_HEDGE_DEFAULT_DELAY,
+    RSSHUB_BREAKER_THRESHOLD,
+    RSSHUB_BREAKER_SECONDS,
+    RSSHUB_COOLDOWN_SECONDS,
+    RSSHUB_HEALTH_FILE,
     RSS_ITEMS_PER_CHANNEL,
+    RSS_STREAMING_PARSER,
+    RSS_MAX_ENTRY_CHARS,
+    RSS_MAX_FEED_BYTES,
     DEFAULT_CHANNELS,
+    CHAT_ID,
+    SUBSCRIPTIONS_DIR,
+    FEED_CACHE_ENABLED,
+    FEED_CACHE_TTL,
+    FEED_CACHE_FILE,
 )
 
 logger = get_logger(__name__)
 
 SUBSCRIPTIONS_FILE = os.path.join(os.path.dirname(__file__), "subscriptions.json")
 
+# 订阅表常驻内存，按 mtime 感知外部修改，写入为原子替换
+_SUBSCRIPTIONS = SubscriptionRegistry(SUBSCRIPTIONS_FILE, DEFAULT_CHANNELS)
+# 其他用户各自的订阅表（chat_id -> SubscriptionRegistry），首次使用时创建
+_USER_SUBSCRIPTIONS: Dict[str, SubscriptionRegistry] = {}
+_USER_SUBSCRIPTIONS_LOCK = threading.Lock()
 
-def _build_session() -> requests.Session:
-    """Build a requests session with retry/backoff for transient errors."""
-    session = requests.Session()
-    retry = Retry(
-        total=3,
-        connect=3,
-        read=3,
-        backoff_factor=0.6,
-        status_forcelist=(429, 500, 502, 503, 504),
-        allowed_methods=("GET",),
-        raise_on_status=False,
+# 进行中的频道抓取（每个事件循环一份），并发的相同抓取共享同一个任务
+_INFLIGHT = weakref.WeakKeyDictionary()
+
+# 需要在同一实例上重试的瞬时错误状态码（429 不在此列：交给健康度冷却并切换实例）
+_RETRY_STATUSES = (500, 502, 503, 504)
+
+# 每个事件循环一个共享的连接池客户端（httpx.AsyncClient 不能跨事件循环复用）
+_CLIENTS = weakref.WeakKeyDictionary()
+
+# 持久化 feed 缓存（ETag/Last-Modified + 已解析条目）
+_FEED_CACHE = FeedCache(FEED_CACHE_FILE, FEED_CACHE_TTL) if FEED_CACHE_ENABLED else None
+
+# RSSHub 实例健康度（成功率、延迟 EWMA、429 冷却、熔断、频道路由）
+_HEALTH = HealthTracker(
+    RSSHUB_HEALTH_FILE,
+    failure_threshold=RSSHUB_BREAKER_THRESHOLD,
+    open_seconds=RSSHUB_BREAKER_SECONDS,
+    cooldown_seconds=RSSHUB_COOLDOWN_SECONDS,
+    # 半开试探的名额保留到一次带重试的请求必然结束之后
+    probe_seconds=RSSHUB_TIMEOUT * (RSSHUB_RETRIES + 1),
+)
+
+# 近期成功请求的耗时样本（秒），用于 p95 对冲延迟
+_LATENCIES = deque(maxlen=200)
+# p95 模式至少需要的样本数
+_MIN_LATENCY_SAMPLES = 20
+
+
+def _build_client() -> httpx.AsyncClient:
+    """Build a pooled async HTTP client sized to the fetch concurrency."""
+    pool_size = RSSHUB_CONCURRENCY * (1 + len(RSSHUB_FALLBACKS))
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
     )
-    adapter = HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=10)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    return session
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(RSSHUB_TIMEOUT),
+        limits=limits,
+        follow_redirects=True,
+    )
+
 
+def _get_client() -> httpx.AsyncClient:
+    """返回当前事件循环共享的 HTTP 客户端，按需创建"""
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        client = _build_client()
+        _CLIENTS[loop] = client
+    return client
 
-_SESSION = _build_session()
+
+async def aclose_client():
+    """关闭当前事件循环的共享 HTTP 客户端（应用退出时调用）"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    client = _CLIENTS.pop(loop, None)
+    if client is not None:
+        await client.aclose()
 
 
-def _ensure_subscriptions_file():
-    if not os.path.exists(SUBSCRIPTIONS_FILE):
+def _run_sync(coro):
+    """在新的事件循环中运行协程，供同步脚本使用；不可在运行中的事件循环内调用"""
+
+    async def runner():
         try:
-            with open(SUBSCRIPTIONS_FILE, "w", encoding="utf-8") as f:
-                json.dump(DEFAULT_CHANNELS, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.exception("无法创建订阅文件 %s", SUBSCRIPTIONS_FILE)
-            report_error(e, {"file": SUBSCRIPTIONS_FILE})
+            return await coro
+        finally:
+            await aclose_client()
 
+    return asyncio.run(runner())
 
-def load_subscriptions() -> List[str]:
-    """加载本地保存的订阅（channel_id 列表）"""
-    _ensure_subscriptions_file()
-    try:
-        with open(SUBSCRIPTIONS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return [str(x) for x in data]
-    except Exception as e:
-        logger.exception("加载订阅文件失败：%s", SUBSCRIPTIONS_FILE)
-        report_error(e, {"file": SUBSCRIPTIONS_FILE})
-        return []
 
+def _is_ssl_error(exc: BaseException) -> bool:
+    """httpx 会把 ssl.SSLError 包装在 ConnectError 中，沿异常链查找"""
+    seen = 0
+    while exc is not None and seen < 10:
+        if isinstance(exc, ssl.SSLError):
+            return True
+        exc = exc.__cause__ or exc.__context__
+        seen += 1
+    return False
 
-def save_subscriptions(channels: List[str]):
-    """保存订阅列表到文件"""
-    try:
-        os.makedirs(os.path.dirname(SUBSCRIPTIONS_FILE), exist_ok=True)
-        with open(SUBSCRIPTIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(channels, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.exception("保存订阅文件失败：%s", SUBSCRIPTIONS_FILE)
-        report_error(e, {"file": SUBSCRIPTIONS_FILE, "channels": channels})
+
+def _registry(chat_id=None) -> SubscriptionRegistry:
+    """chat_id 为空或等于 CHAT_ID 时返回主订阅表，否则返回该用户自己的订阅表"""
+    if not chat_id or str(chat_id) == str(CHAT_ID):
+        return _SUBSCRIPTIONS
+    chat_id = str(chat_id)
+    if not chat_id.lstrip("-").isdigit():
+        raise ValueError(f"无效的 chat id：{chat_id}")
+    with _USER_SUBSCRIPTIONS_LOCK:
+        registry = _USER_SUBSCRIPTIONS.get(chat_id)
+        if registry is None:
+            registry = _USER_SUBSCRIPTIONS[chat_id] = SubscriptionRegistry(
+                os.path.join(SUBSCRIPTIONS_DIR, f"{chat_id}.json"), DEFAULT_CHANNELS
+            )
+        return registry
+
+
+def load_subscriptions(chat_id=None) -> List[str]:
+    """
+    返回订阅（channel_id 列表，内存中的副本；文件被外部修改时自动重新加载）。
+    chat_id 为空时为主用户（CHAT_ID）的订阅，否则为该用户自己的订阅。
+    """
+    return _registry(chat_id).channels()
+
+
+def save_subscriptions(channels: List[str], chat_id=None):
+    """整体替换订阅列表并原子写入文件"""
+    _registry(chat_id).replace(channels)
 
 
-def list_subscriptions() -> List[str]:
+def list_subscriptions(chat_id=None) -> List[str]:
     """返回当前订阅源列表"""
-    return load_subscriptions()
+    return _registry(chat_id).channels()
+
+
+def subscription_entries(chat_id=None) -> List[Tuple[str, dict]]:
+    """按顺序返回 (channel_id, 元数据)"""
+    return _registry(chat_id).entries()
+
+
+def subscription_meta(channel_id: str, chat_id=None) -> dict:
+    """频道元数据：weight / limit / base（未设置的键不存在）"""
+    return _registry(chat_id).meta(channel_id)
+
+
+def channel_weights(chat_id=None) -> Dict[str, float]:
+    """订阅文件中设置了 weight 的频道权重"""
+    return _registry(chat_id).weights()
+
 
+def add_subscriptions(channel_ids: List[str], chat_id=None, **meta) -> List[str]:
+    """批量添加订阅（一次写入），返回实际新增的频道"""
+    return _registry(chat_id).add(channel_ids, **meta)
 
-def add_subscription(channel_id: str) -> bool:
+
+def remove_subscriptions(channel_ids: List[str], chat_id=None) -> List[str]:
+    """批量移除订阅（一次写入），返回实际移除的频道"""
+    return _registry(chat_id).remove(channel_ids)
+
+
+def add_subscription(channel_id: str, chat_id=None) -> bool:
     """添加订阅；已存在返回 False，新增返回 True"""
-    channel_id = str(channel_id).strip()
-    if not channel_id:
-        return False
-    channels = load_subscriptions()
-    if channel_id in channels:
-        return False
-    channels.append(channel_id)
-    save_subscriptions(channels)
-    return True
-
-
-def remove_subscription(channel_id: str) -> bool:
+    return bool(_registry(chat_id).add([channel_id]))
+
+
+def remove_subscription(channel_id: str, chat_id=None) -> bool:
     """移除订阅；存在并移除返回 True，否则返回 False"""
-    channel_id = str(channel_id).strip()
-    channels = load_subscriptions()
-    if channel_id not in channels:
-        return False
-    channels = [c for c in channels if c != channel_id]
-    save_subscriptions(channels)
-    return True
+    return bool(_registry(chat_id).remove([channel_id]))
 
 
-def get_channel_news(channel_id, limit=5):
-    """通过 RSSHub 抓取指定频道的最新消息，支持可配置的 RSSHub 实例和备用列表"""
-    bases = [RSSHUB_BASE_URL] + list(RSSHUB_FALLBACKS)
-    last_feed = None
-    last_url = None
+def fetch_plan(
+    chat_ids: Iterable, limit_per_channel: int = RSS_ITEMS_PER_CHANNEL
+) -> Dict[str, dict]:
+    """
+    把多个用户的订阅合并为一份抓取计划：channel_id -> {"limit", "base"}。
+    同一频道只抓取一次：条目数取各用户设置的最大值，首选实例取第一个设置了的用户。
+    """
+    plan = {}
+    for chat_id in chat_ids:
+        for channel_id, meta in _registry(chat_id).entries():
+            entry = plan.setdefault(channel_id, {"limit": 0, "base": None})
+            entry["limit"] = max(entry["limit"], meta.get("limit", limit_per_channel))
+            if entry["base"] is None:
+                entry["base"] = meta.get("base")
+    return plan
 
-    for base in bases:
-        rss_url = f"{base.rstrip('/')}/telegram/channel/{channel_id}"
-        last_url = rss_url
-        try:
-            resp = _SESSION.get(rss_url, timeout=RSSHUB_TIMEOUT)
-            status = resp.status_code
-            feed = feedparser.parse(resp.content)
-            bozo = getattr(feed, "bozo", False)
-            bozo_exc = getattr(feed, "bozo_exception", None)
-            entries_len = len(getattr(feed, "entries", []))
 
-            logger.debug(
-                "RSS try: base=%s channel=%s status=%s bozo=%s entries=%d",
-                base,
-                channel_id,
-                status,
-                bozo,
-                entries_len,
-            )
+async def _get_with_retry(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[dict] = None,
+    stream: bool = False,
+) -> httpx.Response:
+    """GET with backoff on transient statuses and transport errors.
 
-            if status and status != 200:
-                logger.warning(
-                    "RSSHub returned non-200 status for %s at %s: %s",
-                    channel_id,
-                    base,
-                    status,
-                )
-
-            if bozo and bozo_exc:
-                logger.warning(
-                    "feedparser bozo for %s at %s: %s", channel_id, base, bozo_exc
-                )
-                report_error(
-                    bozo_exc,
-                    {"channel_id": channel_id, "url": rss_url, "status": status},
-                )
-
-            # consider this feed successful if we have at least one entry and status is 200 or unknown
-            if entries_len > 0 and (status is None or status == 200):
-                last_feed = feed
-                logger.info(
-                    "Using RSSHub base %s for channel %s (entries=%d)",
-                    base,
-                    channel_id,
-                    entries_len,
-                )
-                break
-            else:
-                # try next base
-                logger.debug(
-                    "No entries from %s, will try next base if available", rss_url
-                )
+    With stream=True the body is not read; the caller must close the response.
+    """
+    for i in range(RSSHUB_RETRIES + 1):
+        try:
+            request = client.build_request("GET", url, headers=headers)
+            resp = await client.send(request, stream=stream)
+        except httpx.TransportError:
+            if i < RSSHUB_RETRIES:
+                await asyncio.sleep(RSSHUB_RETRY_BACKOFF * (2**i))
                 continue
+            raise
+        if resp.status_code in _RETRY_STATUSES and i < RSSHUB_RETRIES:
+            await resp.aclose()
+            await asyncio.sleep(RSSHUB_RETRY_BACKOFF * (2**i))
+            continue
+        return resp
+    return resp
+
+
+def _rss_url(base: str, channel_id: str) -> str:
+    return f"{base.rstrip('/')}/telegram/channel/{channel_id}"
 
-        except SSLError as e:
-            logger.warning("SSL 错误，准备切换实例：channel=%s base=%s err=%s", channel_id, base, e)
+
+async def _parse_feed(resp: httpx.Response, rss_url: str, limit: int):
+    """
+    解析 feed 响应，返回 (feed, complete)；complete 表示 feed 中没有超出 limit 的条目。
+
+    流式模式下边读边解析，读满 limit 个条目或达到 RSS_MAX_FEED_BYTES 即停止读取；
+    XML 不规范时沿用已读到的字节，继续读取剩余部分（同样受 RSS_MAX_FEED_BYTES 限制）
+    交给容错的 feedparser，不重新请求。
+    """
+    loop = asyncio.get_running_loop()
+    truncated = False
+    if RSS_STREAMING_PARSER:
+        parser = StreamingFeedParser(limit, RSS_MAX_ENTRY_CHARS)
+        chunks = []
+        received = 0
+        # 只统计解析本身的耗时（不含等待网络数据）
+        parse_seconds = 0.0
+        stream = resp.aiter_bytes()
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                received += len(chunk)
+                started = time.perf_counter()
+                parser.feed(chunk)
+                parse_seconds += time.perf_counter() - started
+                if parser.done:
+                    break
+                if received >= RSS_MAX_FEED_BYTES:
+                    logger.warning(
+                        "feed 超过 %d 字节，停止读取：%s", RSS_MAX_FEED_BYTES, rss_url
+                    )
+                    truncated = True
+                    break
+            feed = parser.close(truncated)
+            metrics.observe("rss_parse_seconds", parse_seconds, parser="stream")
+            return feed, feed.complete
+        except ParseError as e:
+            logger.info("流式解析失败，回退到 feedparser：%s (%s)", rss_url, e)
+        # 同一个迭代器接着读，已读到的字节不再重复下载
+        if not truncated:
+            async for chunk in stream:
+                chunks.append(chunk)
+                received += len(chunk)
+                if received >= RSS_MAX_FEED_BYTES:
+                    logger.warning(
+                        "feed 超过 %d 字节，停止读取：%s", RSS_MAX_FEED_BYTES, rss_url
+                    )
+                    truncated = True
+                    break
+        body = b"".join(chunks)
+    else:
+        body = resp.content
+    # feedparser 是纯 Python 的 CPU 工作，放到线程中避免阻塞事件循环
+    with metrics.timer("rss_parse_seconds", parser="feedparser"):
+        feed = await loop.run_in_executor(None, feedparser.parse, body)
+    return feed, not truncated and len(getattr(feed, "entries", [])) <= limit
+
+
+# 条目结束标签（RSS / Atom），用于在不解析的情况下判断已读到的条目数
+_ENTRY_END_TAGS = (b"</item>", b"</entry>")
+# 跨块拼接时保留的上一块末尾长度：足以补全任一被切开的结束标签
+_TAIL_BYTES = max(len(tag) for tag in _ENTRY_END_TAGS) - 1
+
+
+async def _read_feed_body(resp: httpx.Response, rss_url: str, limit: int):
+    """
+    读取 feed 响应体，返回 (body, truncated)：已读到 limit 个条目结束标签
+    或达到 RSS_MAX_FEED_BYTES 时停止读取（truncated=True）。
+    """
+    chunks = []
+    received = 0
+    entries = 0
+    tail = b""
+    async for chunk in resp.aiter_bytes():
+        chunks.append(chunk)
+        received += len(chunk)
+        # 拼上一块的末尾，避免结束标签跨块时漏计；完整落在末尾里的标签上一轮已计过
+        window = tail + chunk
+        entries += sum(window.count(tag) - tail.count(tag) for tag in _ENTRY_END_TAGS)
+        tail = window[-_TAIL_BYTES:]
+        if entries >= limit:
+            return b"".join(chunks), True
+        if received >= RSS_MAX_FEED_BYTES:
+            logger.warning("feed 超过 %d 字节，停止读取：%s", RSS_MAX_FEED_BYTES, rss_url)
+            return b"".join(chunks), True
+    return b"".join(chunks), False
+
+
+async def _parse_feed_offloaded(resp: httpx.Response, rss_url: str, limit: int):
+    """
+    CPU_BACKEND=process 时的解析：事件循环只负责读取字节，解析与 HTML 清理在进程池中
+    完成，返回紧凑的行元组。返回 (rows, entries, complete, bozo)。
+    """
+    body, truncated = await _read_feed_body(resp, rss_url, limit)
+    with metrics.timer("rss_parse_seconds", parser="process"):
+        return await cpu_backend.run(
+            cpu_backend.parse_feed_rows,
+            body,
+            limit,
+            RSS_MAX_ENTRY_CHARS,
+            truncated,
+            RSS_STREAMING_PARSER,
+        )
+
+
+async def _fetch_from_base(channel_id: str, base: str, limit: int):
+    """从单个 RSSHub 实例抓取并解析频道 feed；成功返回条目列表，否则返回 None"""
+    rss_url = _rss_url(base, channel_id)
+    started = time.monotonic()
+    try:
+        headers = _FEED_CACHE.validators(rss_url, limit) if _FEED_CACHE else {}
+        resp = await _get_with_retry(
+            _get_client(),
+            rss_url,
+            headers,
+            stream=RSS_STREAMING_PARSER or cpu_backend.PROCESS,
+        )
+        try:
+            items = await _handle_response(
+                resp, channel_id, base, rss_url, limit, started
+            )
+        finally:
+            await resp.aclose()
+        metrics.observe(
+            "rss_fetch_seconds",
+            time.monotonic() - started,
+            base=base,
+            status=str(resp.status_code),
+        )
+        return items
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        metrics.observe(
+            "rss_fetch_seconds",
+            time.monotonic() - started,
+            base=base,
+            status="error",
+        )
+        # 只有传输层错误（连接/超时/SSL）算作实例故障；本地处理中的异常与实例健康无关
+        if isinstance(e, httpx.TransportError) or _is_ssl_error(e):
+            _HEALTH.record_failure(base)
+        if _is_ssl_error(e):
+            logger.warning(
+                "SSL 错误，准备切换实例：channel=%s base=%s err=%s", channel_id, base, e
+            )
             report_error(e, {"channel_id": channel_id, "url": rss_url, "ssl": True})
-            continue
-        except Exception as e:
+        else:
             logger.exception("抓取频道 %s 在 %s 时发生错误：%s", channel_id, base, e)
             report_error(e, {"channel_id": channel_id, "url": rss_url})
-            continue
+        return None
+
+
+async def _handle_response(
+    resp: httpx.Response,
+    channel_id: str,
+    base: str,
+    rss_url: str,
+    limit: int,
+    started: float,
+):
+    """处理单个实例的响应；成功返回条目列表，否则返回 None"""
+    status = resp.status_code
+    if status == 304 and _FEED_CACHE is not None:
+        items = _FEED_CACHE.revalidated(rss_url, limit)
+        if items is not None:
+            latency = time.monotonic() - started
+            _LATENCIES.append(latency)
+            _HEALTH.record_success(base, latency, channel_id)
+            logger.info(
+                "RSSHub base %s not modified for channel %s, reuse cache (entries=%d)",
+                base,
+                channel_id,
+                len(items),
+            )
+            return items
+
+    if status == 429:
+        _HEALTH.record_failure(
+            base, status, parse_retry_after(resp.headers.get("retry-after"))
+        )
+        logger.warning("RSSHub 限流：channel=%s base=%s", channel_id, base)
+        return None
+
+    if status != 200:
+        logger.warning(
+            "RSSHub returned non-200 status for %s at %s: %s",
+            channel_id,
+            base,
+            status,
+        )
+        # 404 等 4xx 多是频道本身的问题（不存在/私有），不计入实例的连续失败与熔断
+        if status >= 500:
+            _HEALTH.record_failure(base, status)
+        return None
+
+    if cpu_backend.PROCESS:
+        rows, entries_len, complete, bozo_msg = await _parse_feed_offloaded(
+            resp, rss_url, limit
+        )
+        bozo = bozo_msg is not None
+        bozo_exc = ValueError(bozo_msg) if bozo else None
+    else:
+        feed, complete = await _parse_feed(resp, rss_url, limit)
+        bozo = getattr(feed, "bozo", False)
+        bozo_exc = getattr(feed, "bozo_exception", None)
+        entries_len = len(getattr(feed, "entries", []))
+
+    logger.debug(
+        "RSS try: base=%s channel=%s status=%s bozo=%s entries=%d",
+        base,
+        channel_id,
+        status,
+        bozo,
+        entries_len,
+        extra={"sample": "rss_try"},
+    )
+
+    if bozo and bozo_exc:
+        logger.warning("feedparser bozo for %s at %s: %s", channel_id, base, bozo_exc)
+        report_error(
+            bozo_exc, {"channel_id": channel_id, "url": rss_url, "status": status}
+        )
 
-    if last_feed is None:
-        logger.warning("所有 RSSHub 实例均未返回内容，最后尝试 URL: %s", last_url)
-        return []
+    # consider this feed successful if we have at least one entry
+    if entries_len > 0:
+        logger.info(
+            "Using RSSHub base %s for channel %s (entries=%d)",
+            base,
+            channel_id,
+            entries_len,
+        )
+        latency = time.monotonic() - started
+        _LATENCIES.append(latency)
+        _HEALTH.record_success(base, latency, channel_id)
+        if cpu_backend.PROCESS:
+            items = [_item_from_row(row, channel_id) for row in rows]
+        else:
+            items = _build_items(feed, channel_id, limit)
+        if _FEED_CACHE is not None:
+            _FEED_CACHE.put(
+                rss_url,
+                items,
+                complete=complete,
+                etag=resp.headers.get("etag"),
+                last_modified=resp.headers.get("last-modified"),
+            )
+        return items
+
+    # 空 feed 是频道的问题（无内容或已失效），实例本身是健康的，不计入失败
+    logger.debug("No entries from %s, will try next base if available", rss_url)
+    return None
+
+
+def _item_from_row(row: tuple, channel_id: str) -> dict:
+    item = {"source": channel_id}
+    item.update(zip(ENTRY_FIELDS, row))
+    return item
 
+
+def _build_items(feed, channel_id: str, limit: int) -> List[dict]:
     news_items = []
     try:
-        for entry in last_feed.entries[:limit]:
-            news_items.append(
-                {
-                    "source": channel_id,
-                    "title": entry.get("title", ""),
-                    "content": entry.get("summary", ""),
-                    "link": entry.get("link", ""),
-                }
-            )
+        for entry in feed.entries[:limit]:
+            # 摘要 HTML 转为纯文本，正文中的链接单独保存
+            news_items.append(_item_from_row(normalize_entry(entry), channel_id))
     except Exception as e:
         logger.exception("解析 RSS 条目失败：%s", channel_id)
-        report_error(e, {"channel_id": channel_id, "url": last_url})
+        report_error(e, {"channel_id": channel_id})
     return news_items
 
 
-def get_all_news(limit_per_channel=RSS_ITEMS_PER_CHANNEL):
-    """从所有已保存的订阅源抓取消息并合并返回"""
-    channels = load_subscriptions()
-    if not channels:
-        return []
+def _save_state_sync():
+    if _FEED_CACHE is not None:
+        _FEED_CACHE.save()
+    _HEALTH.save()
+
+
+async def _save_state():
+    """持久化 feed 缓存与实例健康状态（文件 I/O 放到线程中）"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, _save_state_sync)
 
+
+def _hedge_delay() -> Optional[float]:
+    """返回对冲延迟（秒）；未启用对冲时返回 None"""
+    if RSSHUB_HEDGE_DELAY in ("", "0", "off"):
+        return None
+    if RSSHUB_HEDGE_DELAY == "p95":
+        if len(_LATENCIES) < _MIN_LATENCY_SAMPLES:
+            return RSSHUB_HEDGE_DEFAULT_DELAY
+        samples = sorted(_LATENCIES)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return max(RSSHUB_HEDGE_MIN_DELAY, p95)
+    try:
+        delay = float(RSSHUB_HEDGE_DELAY)
+    except ValueError:
+        logger.warning("无效的 RSSHUB_HEDGE_DELAY=%s，已使用顺序回退", RSSHUB_HEDGE_DELAY)
+        return None
+    return delay if delay > 0 else None
+
+
+async def _fetch_hedged(channel_id: str, bases: List[str], limit: int, delay: float):
+    """
+    对冲抓取：先请求第一个实例，若 delay 秒内未成功（超时或失败）则追加请求下一个实例，
+    返回最先成功的结果并取消其余请求。
+    """
+    remaining = list(bases)
+    pending = set()
+
+    def launch():
+        base = remaining.pop(0)
+        pending.add(asyncio.ensure_future(_fetch_from_base(channel_id, base, limit)))
+
+    launch()
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=delay if remaining else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                items = task.result()
+                if items is not None:
+                    return items
+            if remaining:
+                if not done:
+                    logger.debug(
+                        "Hedging channel %s: no answer after %.2fs, firing %s",
+                        channel_id,
+                        delay,
+                        remaining[0],
+                    )
+                launch()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _fetch_channel(channel_id, limit, preferred_base=None):
+    bases = [RSSHUB_BASE_URL] + list(RSSHUB_FALLBACKS)
+    if preferred_base and preferred_base not in bases:
+        bases.append(preferred_base)
+    # 订阅中指定的首选实例可用时总是先试，冷却/熔断中仍按健康度兜底
+    bases = _HEALTH.order(bases, channel_id, preferred=preferred_base)
+
+    if _FEED_CACHE is not None:
+        cached = _FEED_CACHE.fresh_items(
+            [_rss_url(base, channel_id) for base in bases], limit
+        )
+        if cached is not None:
+            logger.debug(
+                "Feed cache hit for channel %s (entries=%d)",
+                channel_id,
+                len(cached),
+                extra={"sample": "feed_cache_hit"},
+            )
+            metrics.inc("rss_cache_hits_total")
+            return cached
+
+    delay = _hedge_delay() if len(bases) > 1 else None
+    if delay is not None:
+        items = await _fetch_hedged(channel_id, bases, limit, delay)
+        if items is not None:
+            return items
+    else:
+        for base in bases:
+            items = await _fetch_from_base(channel_id, base, limit)
+            if items is not None:
+                return items
+
+    logger.warning("所有 RSSHub 实例均未返回内容：channel=%s bases=%s", channel_id, bases)
+    # 按频道的失败只用计数器记录，耗时直方图不按频道拆分，避免时间序列随订阅数膨胀
+    metrics.inc("rss_channel_failures_total", channel=channel_id)
+    return []
+
+
+async def _fetch_channel_shared(channel_id, limit, preferred_base=None):
+    """
+    并发的相同抓取（如多个用户同时 /digest）共享同一次请求；
+    单个调用方被取消不影响其他等待者。每个调用方得到各自的条目副本。
+    """
+    inflight = _INFLIGHT.setdefault(asyncio.get_running_loop(), {})
+    key = (channel_id, limit, preferred_base)
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_channel(channel_id, limit, preferred_base))
+        inflight[key] = task
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+    items = await asyncio.shield(task)
+    return [dict(item) for item in items]
+
+
+async def aget_channel_news(channel_id, limit=5, chat_id=None):
+    """通过 RSSHub 异步抓取指定频道的最新消息，支持可配置的 RSSHub 实例和备用列表"""
+    base = _registry(chat_id).meta(channel_id).get("base")
+    try:
+        return await _fetch_channel_shared(channel_id, limit, base)
+    finally:
+        await _save_state()
+
+
+async def afetch_plan(plan: Dict[str, dict]) -> Dict[str, List[dict]]:
+    """
+    按抓取计划（见 fetch_plan）并发抓取，每个频道一次，返回 channel_id -> 条目；
+    抓取失败的频道为空列表。并发数由 RSSHUB_CONCURRENCY 控制。
+    """
+    if not plan:
+        return {}
+
+    semaphore = asyncio.Semaphore(RSSHUB_CONCURRENCY)
+
+    async def fetch(ch, entry):
+        async with semaphore:
+            return await _fetch_channel_shared(ch, entry["limit"], entry.get("base"))
+
+    try:
+        results = await asyncio.gather(
+            *(fetch(ch, entry) for ch, entry in plan.items()), return_exceptions=True
+        )
+    finally:
+        await _save_state()
+
+    news = {}
+    for ch, result in zip(plan, results):
+        if isinstance(result, BaseException):
+            # 简单忽略单个源错误，调用方可记录或处理
+            logger.error("抓取来源 %s 失败: %s", ch, result)
+            report_error(result, {"channel": ch})
+            result = []
+        news[ch] = result
+    return news
+
+
+async def aget_all_news(
+    limit_per_channel=RSS_ITEMS_PER_CHANNEL,
+    channels: Optional[List[str]] = None,
+    chat_id=None,
+):
+    """
+    从 chat_id（默认主用户）的所有订阅源（或指定的 channels）并发抓取消息并合并返回，
+    订阅元数据可覆盖单个频道的条目数和首选实例
+    """
+    registry = _registry(chat_id)
+    if channels is None:
+        entries = registry.entries()
+    else:
+        entries = [(ch, registry.meta(ch)) for ch in channels]
+    plan = {
+        ch: {"limit": meta.get("limit", limit_per_channel), "base": meta.get("base")}
+        for ch, meta in entries
+    }
+    news = await afetch_plan(plan)
     all_items = []
-    max_workers = min(5, len(channels))
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {
-            executor.submit(get_channel_news, ch, limit_per_channel): ch
-            for ch in channels
-        }
-        for future in as_completed(futures):
-            ch = futures[future]
-            try:
-                all_items.extend(future.result())
-            except Exception as e:
-                # 简单忽略单个源错误，调用方可记录或处理
-                logger.error("抓取来源 %s 失败: %s", ch, e)
-                report_error(e, {"channel": ch})
-                continue
+    for ch in plan:
+        all_items.extend(news[ch])
     return all_items
+
+
+def get_channel_news(channel_id, limit=5, chat_id=None):
+    """同步版本的 aget_channel_news，供脚本使用"""
+    return _run_sync(aget_channel_news(channel_id, limit, chat_id))
+
+
+def get_all_news(
+    limit_per_channel=RSS_ITEMS_PER_CHANNEL, channels=None, chat_id=None
+):
+    """同步版本的 aget_all_news，供脚本使用"""
+    return _run_sync(aget_all_news(limit_per_channel, channels, chat_id))
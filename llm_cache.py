@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Callable, Optional
+import metrics
+from logger import get_logger, report_error
+
+logger = get_logger(__name__)
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class LLMCache:
+    """
+    以请求内容哈希为 key 的 LLM 响应缓存（SQLite），按 TTL 与总大小淘汰。
+
+    get_or_compute 对并发的相同请求做 single-flight：只有一个线程真正调用上游，
+    其余线程等待并复用其结果。被判定为错误的结果不会写入缓存。
+    """
+
+    def __init__(self, path: str, ttl: float, max_bytes: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._inflight = {}
+        self._flight_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        base_url: str, model: str, temperature: float, max_tokens: int, prompt: str
+    ) -> str:
+        raw = json.dumps(
+            [base_url, model, temperature, max_tokens, prompt], ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " size INTEGER NOT NULL"
+                ")"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_created ON responses (created_at)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with self._lock:
+                row = (
+                    self._connect()
+                    .execute(
+                        "SELECT value FROM responses WHERE key = ? AND created_at >= ?",
+                        (key, time.time() - self.ttl),
+                    )
+                    .fetchone()
+                )
+        except Exception as e:
+            logger.exception("读取 LLM 缓存失败：%s", self.path)
+            report_error(e, {"file": self.path})
+            return None
+        return row[0] if row else None
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at, size)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, value, now, len(value.encode("utf-8"))),
+                )
+                conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+                )
+                # 超出总大小时从最旧的开始淘汰
+                total = conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()[0]
+                if total > self.max_bytes:
+                    rows = conn.execute(
+                        "SELECT key, size FROM responses ORDER BY created_at"
+                    ).fetchall()
+                    evict = []
+                    for old_key, size in rows:
+                        if total <= self.max_bytes:
+                            break
+                        evict.append((old_key,))
+                        total -= size
+                    conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+                conn.commit()
+        except Exception as e:
+            logger.exception("写入 LLM 缓存失败：%s", self.path)
+            report_error(e, {"file": self.path})
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], str],
+        is_error: Callable[[str], bool],
+    ) -> str:
+        cached = self.get(key)
+        if cached is not None:
+            logger.info("LLM 缓存命中：%s", key[:12])
+            metrics.inc("llm_cache_hits_total")
+            return cached
+
+        with self._flight_lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            logger.info("等待相同的 LLM 请求完成：%s", key[:12])
+            flight.event.wait()
+            if flight.result is not None:
+                return flight.result
+            # 领头请求异常退出，自行调用
+            return compute()
+
+        try:
+            # 上一个领头请求可能刚好在本次查询缓存后完成
+            result = self.get(key)
+            if result is not None:
+                flight.result = result
+                return result
+            result = compute()
+            if isinstance(result, str) and result.strip() and not is_error(result):
+                self.put(key, result)
+            flight.result = result
+            return result
+        finally:
+            with self._flight_lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
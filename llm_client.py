@@ -0,0 +1,101 @@
+import time
+import threading
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+from http_utils import parse_retry_after
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TokenBucket:
+    """线程安全的令牌桶：平均每秒 rate 个请求，最多突发 burst 个；rate <= 0 表示不限速"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class LLMClient:
+    """
+    OpenAI 兼容 chat completions 的 HTTP 客户端。
+
+    - 复用连接池（keep-alive），池大小与 LLM 线程池并发一致
+    - 客户端令牌桶限速，避免并行分析触发服务端限流
+    - 重试间隔优先遵循服务端的 Retry-After
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        pool_size: int,
+        timeout: float,
+        backoff: float,
+        max_retry_after: float,
+        rate: float = 0,
+        burst: int = 1,
+    ):
+        base = base_url.rstrip("/")
+        if base.endswith("/v1"):
+            self.url = f"{base}/chat/completions"
+        else:
+            self.url = f"{base}/v1/chat/completions"
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self._bucket = TokenBucket(rate, burst)
+        self._session = requests.Session()
+        self._session.headers.update(
+            {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {api_key}",
+            }
+        )
+        # 重试由调用方控制（需要区分错误提示），适配器本身不重试
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=max(1, pool_size), max_retries=0
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def post(self, payload: dict, stream: bool = False) -> requests.Response:
+        """发送一次请求（先获取限速令牌）"""
+        self._bucket.acquire()
+        return self._session.post(
+            self.url, json=payload, timeout=self.timeout, stream=stream
+        )
+
+    def retry_delay(self, resp: Optional[requests.Response], retry: int) -> float:
+        """第 retry 次重试前的等待时间：有 Retry-After 时遵循（有上限），否则线性退避"""
+        if resp is not None:
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    logger.warning(
+                        "LLM Retry-After=%.0fs 超过上限，按 %.0fs 等待",
+                        retry_after,
+                        self.max_retry_after,
+                    )
+                return min(retry_after, self.max_retry_after)
+        return self.backoff * (retry + 1)
@@ -1,8 +1,14 @@
 import logging
 import os
+import copy
+import time
+import queue
+import atexit
+import hashlib
+import threading
 import traceback
 import json
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 try:
     import requests
@@ -10,16 +16,101 @@ except Exception:
     requests = None
 
 _LOGGER_CONFIGURED = False
+_LISTENER = None
+
+_TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+
+class _JsonFormatter(logging.Formatter):
+    """单行 JSON 日志：ts、level、logger、msg，异常时附带 exc"""
+
+    def format(self, record):
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S")
+            + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _SamplingFilter(logging.Filter):
+    """
+    对带有 extra={"sample": key} 的高频日志按 key 采样：每 every 条保留 1 条。
+    未标记的日志不受影响。
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        if key is None or self.every == 1:
+            return True
+        with self._lock:
+            n = self._counts.get(key, 0)
+            self._counts[key] = n + 1
+        return n % self.every == 0
+
+
+class _QueueHandler(QueueHandler):
+    """在调用线程中只格式化消息本身，I/O 交给 QueueListener 线程；队列满时丢弃"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _stop_listener():
+    if _LISTENER is not None:
+        _LISTENER.stop()
 
 
 def configure_logging():
-    """Configure root logger once based on environment variables."""
-    global _LOGGER_CONFIGURED
+    """Configure root logger once based on environment variables.
+
+    - LOG_LEVEL / LOG_FILE: level and optional rotating log file
+    - LOG_FORMAT: "text" (default) or "json" (one JSON object per line)
+    - LOG_QUEUE=1: handlers run on a background QueueListener thread, so log calls
+      never do stream/file I/O (or file rotation) on the calling thread
+    - LOG_QUEUE_SIZE: queued records before new ones are dropped
+      (default 10000, 0 = unbounded)
+    - LOG_SAMPLE_EVERY: keep 1 in N records logged with extra={"sample": key} (default 1)
+    """
+    global _LOGGER_CONFIGURED, _LISTENER
     if _LOGGER_CONFIGURED:
         return
 
     level = os.getenv("LOG_LEVEL", "INFO").upper()
     log_file = os.getenv("LOG_FILE")
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        formatter = _JsonFormatter()
+    else:
+        formatter = logging.Formatter(_TEXT_FORMAT)
 
     handlers = [logging.StreamHandler()]
     if log_file:
@@ -28,10 +119,23 @@ def configure_logging():
             log_file, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8"
         )
         handlers.append(fh)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if os.getenv("LOG_QUEUE", "0") == "1":
+        log_queue = queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        _LISTENER = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _LISTENER.start()
+        atexit.register(_stop_listener)
+        handlers = [_QueueHandler(log_queue)]
+
+    # 每个 handler 各自计数：共用一个过滤器时同一条日志会被计数多次，各 handler 保留的条目也不同
+    every = int(os.getenv("LOG_SAMPLE_EVERY", "1"))
+    for handler in handlers:
+        handler.addFilter(_SamplingFilter(every))
 
     logging.basicConfig(
         level=getattr(logging, level, logging.INFO),
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
         handlers=handlers,
     )
 
@@ -43,32 +147,173 @@ def get_logger(name=None):
     return logging.getLogger(name)
 
 
+class _ErrorReporter:
+    """
+    后台批量上报错误：调用方只登记错误，从不阻塞在网络上。
+
+    指纹相同的错误在登记时即合并计数；待发送的不同错误数达到 max_pending 后新错误被丢弃，
+    丢弃数随下一批上报。后台线程每 flush_interval 秒（或攒满 batch_size 个时）发送一批。
+    """
+
+    def __init__(
+        self, url: str, max_pending: int, flush_interval: float, batch_size: int
+    ):
+        self.url = url
+        self.max_pending = max(1, max_pending)
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self._pending = {}
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def submit(self, exc: BaseException, context: dict):
+        self._ensure_started()
+        fp = _fingerprint(exc)
+        now = time.time()
+        with self._lock:
+            entry = self._pending.get(fp)
+            if entry is not None:
+                entry["count"] += 1
+                entry["last_seen"] = now
+                return
+            if len(self._pending) >= self.max_pending:
+                self._dropped += 1
+                return
+            self._pending[fp] = {
+                "exc": exc,
+                "context": context,
+                "count": 1,
+                "first_seen": now,
+                "last_seen": now,
+            }
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="error-reporter", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                dropped, self._dropped = self._dropped, 0
+            if pending or dropped:
+                reports = [_report_payload(fp, entry) for fp, entry in pending.items()]
+                self._send({"reports": reports, "dropped": dropped})
+            if self._stop.is_set():
+                return
+
+    def _send(self, payload: dict):
+        try:
+            requests.post(
+                self.url,
+                data=json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+                timeout=5,
+            )
+        except Exception as e:
+            logging.getLogger("error_reporter").error(
+                "Failed to send %d error reports to %s: %s",
+                len(payload["reports"]),
+                self.url,
+                e,
+            )
+
+    def close(self, timeout: float = 5.0):
+        """进程退出时发送剩余错误（最多等待 timeout 秒）"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+
+def _fingerprint(exc: BaseException) -> str:
+    """错误指纹：异常类型 + 抛出位置；没有 traceback 时使用错误信息"""
+    parts = [type(exc).__module__, type(exc).__qualname__]
+    tb = exc.__traceback__
+    if tb is None:
+        parts.append(str(exc)[:200])
+    while tb is not None:
+        code = tb.tb_frame.f_code
+        parts.append(f"{code.co_filename}:{code.co_name}:{tb.tb_lineno}")
+        tb = tb.tb_next
+    return hashlib.sha1("|".join(parts).encode("utf-8", "replace")).hexdigest()[:16]
+
+
+def _format_traceback(exc: BaseException) -> str:
+    return "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+
+
+def _report_payload(fp: str, entry: dict) -> dict:
+    exc = entry["exc"]
+    return {
+        "error": str(exc),
+        "traceback": _format_traceback(exc),
+        "context": entry["context"] or {},
+        "fingerprint": fp,
+        "count": entry["count"],
+        "first_seen": entry["first_seen"],
+        "last_seen": entry["last_seen"],
+    }
+
+
+_REPORTER = None
+
+
+def _get_reporter():
+    global _REPORTER
+    url = os.getenv("ERROR_REPORT_URL")
+    if not url or requests is None:
+        return None
+    if _REPORTER is None:
+        _REPORTER = _ErrorReporter(
+            url,
+            max_pending=int(os.getenv("ERROR_REPORT_QUEUE_SIZE", "1000")),
+            flush_interval=float(os.getenv("ERROR_REPORT_FLUSH_INTERVAL", "5")),
+            batch_size=int(os.getenv("ERROR_REPORT_BATCH_SIZE", "50")),
+        )
+    return _REPORTER
+
+
 def report_error(exc: Exception, context: dict = None):
-    """Send an error report to remote endpoint if configured, otherwise log the details.
+    """Report an error to the remote endpoint if configured, otherwise log the details.
+
+    Never blocks the caller: remote reports are queued (repeated errors merged by
+    fingerprint with a count) and sent in batches by a background thread.
 
     Environment variables:
-    - ERROR_REPORT_URL: if set, the module will POST JSON to this URL with keys: error, traceback, context
+    - ERROR_REPORT_URL: if set, batches are POSTed as JSON {"reports": [...], "dropped": n};
+      each report has keys: error, traceback, context, fingerprint, count, first_seen, last_seen
+    - ERROR_REPORT_QUEUE_SIZE: max distinct pending errors, extra ones are dropped (default 1000)
+    - ERROR_REPORT_FLUSH_INTERVAL: seconds between batches (default 5)
+    - ERROR_REPORT_BATCH_SIZE: distinct errors that trigger an early send (default 50)
     """
     logger = get_logger("error_reporter")
     try:
-        payload = {
-            "error": str(exc),
-            "traceback": traceback.format_exc(),
-            "context": context or {},
-        }
-        url = os.getenv("ERROR_REPORT_URL")
-        if url and requests is not None:
-            try:
-                requests.post(url, json=payload, timeout=5)
-            except Exception as e:
-                logger.error("Failed to send error report to %s: %s", url, e)
+        reporter = _get_reporter()
+        if reporter is not None:
+            reporter.submit(exc, context)
         else:
             # no remote endpoint configured or requests not installed; log the payload
             logger.error(
                 "Error reported: %s\n%s\nContext: %s",
-                payload["error"],
-                payload["traceback"],
-                json.dumps(payload["context"], ensure_ascii=False),
+                exc,
+                _format_traceback(exc).rstrip(),
+                json.dumps(context or {}, ensure_ascii=False, default=str),
             )
     except Exception:
         logger.exception("Failed inside report_error")
@@ -4,29 +4,190 @@ load_dotenv()
 
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
-from telegram.helpers import escape_markdown
 import re
-from config import BOT_TOKEN, CHAT_ID
+import time
+import secrets
+import asyncio
+from typing import Dict, List, Tuple
+from config import (
+    BOT_TOKEN,
+    CHAT_ID,
+    ALLOWED_CHAT_IDS,
+    RSS_ITEMS_PER_CHANNEL,
+    DIGEST_SINCE_LAST,
+    SEEN_STORE_FILE,
+    SEEN_RETENTION_DAYS,
+    DIGEST_REFRESH_INTERVAL,
+    DIGEST_MAX_AGE,
+    DIGEST_PUSH_TIMES,
+    DIGEST_TIMEZONE,
+    METRICS_HOST,
+    METRICS_PORT,
+    BOT_MODE,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_URL,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_MAX_CONNECTIONS,
+)
 from fetcher import (
-    get_channel_news,
-    list_subscriptions,
-    add_subscription,
-    get_all_news,
+    aget_channel_news,
+    afetch_plan,
+    aclose_client,
+    fetch_plan,
+    subscription_entries,
+    add_subscriptions,
+    remove_subscriptions,
+    channel_weights,
 )
-from analyzer import analyze_news
+from analyzer import analyze_news, is_llm_error
+from seen_store import SeenStore, item_key
+from messenger import ProgressiveMessage, send_text, split_message
+from scheduler import DigestScheduler, parse_push_times
+import metrics
+import cpu_backend
 from logger import get_logger, report_error
 
 logger = get_logger(__name__)
 
+# 已进入简报的条目，用于增量简报
+_SEEN_STORE = SeenStore(SEEN_STORE_FILE, SEEN_RETENTION_DAYS)
+
+
+def _recipients() -> List[str]:
+    """允许使用 Bot 并接收定时推送的用户：CHAT_ID 在前，其后为 ALLOWED_CHAT_IDS"""
+    ids = [str(CHAT_ID)] if CHAT_ID else []
+    return list(dict.fromkeys(ids + [str(x) for x in ALLOWED_CHAT_IDS]))
+
+
+def _is_allowed(update: Update) -> bool:
+    return str(update.effective_chat.id) in _recipients()
+
+
+def _is_owner(update: Update) -> bool:
+    return str(update.effective_chat.id) == str(CHAT_ID)
+
+
+def _seen_scope(chat_id) -> str:
+    """已读记录的作用域：主用户沿用原有记录（空字符串），其他用户按 chat id 区分"""
+    return "" if str(chat_id) == str(CHAT_ID) else str(chat_id)
+
+
+async def build_digests(
+    chat_ids: List[str], since_last: bool = DIGEST_SINCE_LAST, on_progress=None
+) -> Dict[str, Tuple[str, List[dict]]]:
+    """
+    为多个用户生成简报，返回 {chat_id: (报告, 参与分析的条目)}；不记录已读。
+
+    所有用户的订阅合并为一份抓取计划，每个频道只抓取一次；输入相同（订阅集、
+    频道权重与新条目都相同）的用户共享同一次分析。
+    since_last=True 时每个用户只分析自己上次简报之后的新条目。
+    on_progress 在流式输出时以当前累计的文本被调用（仅用于第一组分析）。
+    """
+    loop = asyncio.get_running_loop()
+    chat_ids = [str(c) for c in chat_ids]
+    subscriptions = {cid: subscription_entries(cid) for cid in chat_ids}
+    news = await afetch_plan(fetch_plan(chat_ids))
+
+    results = {}
+    groups = {}
+    for cid in chat_ids:
+        items = []
+        for channel_id, meta in subscriptions[cid]:
+            limit = meta.get("limit", RSS_ITEMS_PER_CHANNEL)
+            items.extend(news.get(channel_id, [])[:limit])
+        if not items:
+            results[cid] = ("暂时没有抓取到新资讯。", [])
+            continue
+        if since_last:
+            items = await loop.run_in_executor(
+                None, _SEEN_STORE.filter_new, items, _seen_scope(cid)
+            )
+            if not items:
+                results[cid] = ("自上次简报以来没有新资讯。", [])
+                continue
+        weights = channel_weights(cid)
+        key = (
+            tuple((it.get("source"), item_key(it)) for it in items),
+            tuple(sorted(weights.items())),
+        )
+        group = groups.setdefault(key, {"items": items, "weights": weights, "ids": []})
+        group["ids"].append(cid)
+
+    if len(chat_ids) > 1:
+        logger.info(
+            "简报：%d 个用户，抓取 %d 个频道，%d 组分析",
+            len(chat_ids),
+            len(news),
+            len(groups),
+        )
 
-async def generate_digest():
-    """核心聚合逻辑"""
-    all_raw_news = get_all_news()
+    reports = await asyncio.gather(
+        *(
+            analyze_news(
+                group["items"],
+                on_progress=on_progress if idx == 0 else None,
+                weights=group["weights"],
+            )
+            for idx, group in enumerate(groups.values())
+        )
+    )
+    # 只有真正进入 prompt 的条目才算参与分析，被裁掉的条目下次仍会分析
+    for group, (report, used) in zip(groups.values(), reports):
+        for cid in group["ids"]:
+            results[cid] = (report, used)
+    return results
+
+
+async def build_digest(
+    since_last: bool = DIGEST_SINCE_LAST, on_progress=None, chat_id=None
+):
+    """
+    抓取并分析 chat_id（默认 CHAT_ID）的订阅，返回 (报告, 参与分析的条目)；不记录已读。
+    since_last=True 时只分析上次简报之后的新条目。
+    on_progress 在流式输出时以当前累计的文本被调用。
+    """
+    chat_id = str(chat_id or CHAT_ID or "")
+    results = await build_digests([chat_id], since_last, on_progress)
+    return results[chat_id]
+
+
+async def mark_seen(chat_id, items):
+    if items:
+        await asyncio.get_running_loop().run_in_executor(
+            None, _SEEN_STORE.mark_seen, items, _seen_scope(chat_id)
+        )
 
-    if not all_raw_news:
-        return "暂时没有抓取到新资讯。"
 
-    return await analyze_news(all_raw_news)
+async def generate_digest(
+    since_last: bool = DIGEST_SINCE_LAST, on_progress=None, chat_id=None
+):
+    """核心聚合逻辑：生成简报并在分析成功时记录已读"""
+    chat_id = str(chat_id or CHAT_ID or "")
+    report, items = await build_digest(since_last, on_progress, chat_id)
+    # 仅在分析成功时记录，失败的条目下次仍会被分析
+    if not is_llm_error(report):
+        await mark_seen(chat_id, items)
+    return report
+
+
+async def _push_digest(chat_id: str, report: str):
+    await send_text(_bot, chat_id, report, markdown=True)
+
+
+# 后台预计算与定时推送（DIGEST_REFRESH_INTERVAL / DIGEST_PUSH_TIMES 均未设置时不启动）
+_bot = None
+_SCHEDULER = DigestScheduler(
+    build=lambda: build_digests(_recipients(), since_last=False),
+    deliver=_push_digest,
+    mark_seen=mark_seen,
+    is_error=is_llm_error,
+    refresh_interval=DIGEST_REFRESH_INTERVAL,
+    push_times=parse_push_times(DIGEST_PUSH_TIMES),
+    max_age=DIGEST_MAX_AGE,
+    timezone=DIGEST_TIMEZONE,
+)
 
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -34,57 +195,105 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def digest_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    # 鉴权：只允许你本人操作
-    if str(update.effective_chat.id) != str(CHAT_ID):
+    # 鉴权：只允许 CHAT_ID 与 ALLOWED_CHAT_IDS 中的用户
+    if not _is_allowed(update):
+        return
+    chat_id = str(update.effective_chat.id)
+
+    # /digest new 只看新条目，/digest all 分析全部条目；不带参数时按 DIGEST_SINCE_LAST
+    mode = context.args[0].lower() if context.args else ""
+    since_last = {"new": True, "all": False}.get(mode, DIGEST_SINCE_LAST)
+
+    # 分析全部条目时，直接使用后台预计算且足够新的简报
+    started = time.monotonic()
+    warm = None if since_last else _SCHEDULER.fresh(chat_id)
+    if warm is not None:
+        report, items, _ = warm
+        await send_text(context.bot, chat_id, report, markdown=True)
+        await mark_seen(chat_id, items)
+        metrics.observe("digest_seconds", time.monotonic() - started, source="warm")
         return
 
     status_msg = await update.message.reply_text("正在抓取多源资讯并分析中，请稍候...")
-    report = await generate_digest()
-    safe_report = _escape_markdown_preserve_links(report)
-    await status_msg.edit_text(safe_report, parse_mode="MarkdownV2")
-
-
-def _escape_markdown_preserve_links(text: str) -> str:
-    pattern = r"\[([^\]]+)\]\(([^)]+)\)"
-    links = []
+    # 流式输出时先以纯文本逐步编辑，完成后再整体替换为 MarkdownV2；超长时分多条消息
+    output = ProgressiveMessage(status_msg)
+    report = await generate_digest(
+        since_last=since_last, on_progress=output.update, chat_id=chat_id
+    )
+    await output.finish(report, markdown=True)
+    metrics.observe("digest_seconds", time.monotonic() - started, source="live")
 
-    def repl(match):
-        links.append(match.group(0))
-        return f"LINKTOKEN{len(links)-1}"
 
-    temp = re.sub(pattern, repl, text)
-    temp = escape_markdown(temp, version=2)
-    for i, link in enumerate(links):
-        temp = temp.replace(f"LINKTOKEN{i}", link)
-    return temp
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """各阶段耗时与计数汇总：/stats"""
+    # 鉴权：只允许你本人操作
+    if not _is_owner(update):
+        return
+    for chunk in split_message(metrics.summary()):
+        await update.message.reply_text(chunk)
 
 
 async def list_subs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    subs = list_subscriptions()
+    """列出当前用户的订阅"""
+    if not _is_allowed(update):
+        return
+    subs = subscription_entries(update.effective_chat.id)
     if not subs:
         await update.message.reply_text(
             "当前没有订阅源。使用 /add_sub <channel_id> 添加。"
         )
         return
-    await update.message.reply_text("当前订阅源：\n" + "\n".join(subs))
+    lines = []
+    for channel_id, meta in subs:
+        if meta:
+            extra = ", ".join(f"{k}={v}" for k, v in meta.items())
+            lines.append(f"{channel_id} ({extra})")
+        else:
+            lines.append(channel_id)
+    for chunk in split_message("当前订阅源：\n" + "\n".join(lines)):
+        await update.message.reply_text(chunk)
 
 
 async def add_sub_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """添加订阅，可一次添加多个：/add_sub <channel_id> [channel_id ...]"""
+    if not _is_allowed(update):
+        return
     if len(context.args) == 0:
-        await update.message.reply_text("用法：/add_sub <channel_id>")
+        await update.message.reply_text("用法：/add_sub <channel_id> [channel_id ...]")
         return
-    channel_id = context.args[0]
-    ok = add_subscription(channel_id)
-    if ok:
-        await update.message.reply_text(f"已添加订阅：{channel_id}")
-    else:
-        await update.message.reply_text(f"订阅已存在或无效：{channel_id}")
+    added = add_subscriptions(context.args, chat_id=update.effective_chat.id)
+    skipped = [c for c in dict.fromkeys(context.args) if c not in added]
+    lines = []
+    if added:
+        lines.append("已添加订阅：" + ", ".join(added))
+    if skipped:
+        lines.append("订阅已存在或无效：" + ", ".join(skipped))
+    await update.message.reply_text("\n".join(lines))
+
+
+async def remove_sub_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """移除订阅，可一次移除多个：/remove_sub <channel_id> [channel_id ...]"""
+    if not _is_allowed(update):
+        return
+    if len(context.args) == 0:
+        await update.message.reply_text(
+            "用法：/remove_sub <channel_id> [channel_id ...]"
+        )
+        return
+    removed = remove_subscriptions(context.args, chat_id=update.effective_chat.id)
+    missing = [c for c in dict.fromkeys(context.args) if c not in removed]
+    lines = []
+    if removed:
+        lines.append("已移除订阅：" + ", ".join(removed))
+    if missing:
+        lines.append("未订阅：" + ", ".join(missing))
+    await update.message.reply_text("\n".join(lines))
 
 
 async def fetch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Fetch RSSHub content for a specific channel: /fetch <channel_id> [limit]"""
-    # 鉴权：只允许你本人操作
-    if str(update.effective_chat.id) != str(CHAT_ID):
+    # 鉴权：只允许 CHAT_ID 与 ALLOWED_CHAT_IDS 中的用户
+    if not _is_allowed(update):
         return
 
     if len(context.args) == 0:
@@ -101,7 +310,9 @@ async def fetch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"正在抓取 {channel_id} 的最新 {limit} 条 RSS..."
     )
     try:
-        items = get_channel_news(channel_id, limit=limit)
+        items = await aget_channel_news(
+            channel_id, limit=limit, chat_id=update.effective_chat.id
+        )
     except Exception as e:
         logger.exception("抓取单个源失败：%s", e)
         report_error(e, {"channel_id": channel_id})
@@ -122,18 +333,8 @@ async def fetch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         link = it.get("link") or ""
         parts.append(f"- {title}\n{content}\n{link}")
 
-    text = "\n\n".join(parts)
-    # 如果文本过长，分多条发送
-    if len(text) <= 4000:
-        await status_msg.edit_text(text)
-    else:
-        await status_msg.edit_text(text[:4000])
-        remaining = text[4000:]
-        # 继续发送剩余部分
-        while remaining:
-            chunk = remaining[:4000]
-            remaining = remaining[4000:]
-            await update.message.reply_text(chunk)
+    # 过长时在条目之间切分，续发为新消息（不会切断链接）
+    await ProgressiveMessage(status_msg).finish("\n\n".join(parts))
 
 
 async def global_error_handler(update, context: ContextTypes.DEFAULT_TYPE):
@@ -147,16 +348,76 @@ async def global_error_handler(update, context: ContextTypes.DEFAULT_TYPE):
         logger.exception("Failed to send error report from global handler")
 
 
+async def post_init(application):
+    """启动后台简报任务与指标服务"""
+    global _bot
+    _bot = application.bot
+    _SCHEDULER.start()
+    metrics.start_server(METRICS_HOST, METRICS_PORT)
+
+
+async def post_shutdown(application):
+    """停止后台任务，关闭抓取用的共享 HTTP 连接池与 CPU 进程池"""
+    await _SCHEDULER.stop()
+    await aclose_client()
+    cpu_backend.shutdown()
+
+
+# Telegram 对 secret_token 的要求：1-256 个 A-Z、a-z、0-9、_、-
+_SECRET_TOKEN_RE = re.compile(r"[A-Za-z0-9_-]{1,256}")
+
+
+def run(app):
+    """按 BOT_MODE 启动：默认长轮询；webhook 模式在本地监听，并向 Telegram 注册对外地址"""
+    if BOT_MODE != "webhook":
+        logger.info("Bot 正在运行（长轮询）...")
+        # run_polling 启动时会删除已注册的 webhook，切回轮询无需手动处理
+        app.run_polling()
+        return
+
+    if not WEBHOOK_URL:
+        raise SystemExit("BOT_MODE=webhook 需要设置 WEBHOOK_URL（反向代理对外的 HTTPS 地址）")
+    # 未配置时每次启动随机生成；启动时会重新注册 webhook，Telegram 总是拿到当前的值
+    secret_token = WEBHOOK_SECRET_TOKEN or secrets.token_urlsafe(32)
+    if not _SECRET_TOKEN_RE.fullmatch(secret_token):
+        raise SystemExit("WEBHOOK_SECRET_TOKEN 只能包含 A-Z、a-z、0-9、_、-，长度 1-256")
+
+    logger.info(
+        "Bot 正在运行（webhook）：监听 http://%s:%s/%s，对外地址 %s/%s",
+        WEBHOOK_LISTEN,
+        WEBHOOK_PORT,
+        WEBHOOK_PATH,
+        WEBHOOK_URL,
+        WEBHOOK_PATH,
+    )
+    app.run_webhook(
+        listen=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        url_path=WEBHOOK_PATH,
+        webhook_url=f"{WEBHOOK_URL}/{WEBHOOK_PATH}",
+        secret_token=secret_token,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+    )
+
+
 if __name__ == "__main__":
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(True)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     app.add_handler(CommandHandler("start", start_command))
     app.add_handler(CommandHandler("digest", digest_command))
     app.add_handler(CommandHandler("list_subs", list_subs_command))
     app.add_handler(CommandHandler("add_sub", add_sub_command))
+    app.add_handler(CommandHandler("remove_sub", remove_sub_command))
     app.add_handler(CommandHandler("fetch", fetch_command))
+    app.add_handler(CommandHandler("stats", stats_command))
 
     app.add_error_handler(global_error_handler)
 
-    logger.info("Bot 正在运行...")
-    app.run_polling()
+    run(app)
@@ -0,0 +1,243 @@
+import re
+import asyncio
+from typing import List, Optional, Tuple
+from telegram.error import BadRequest, RetryAfter
+import metrics
+from config import TELEGRAM_MESSAGE_LIMIT, TELEGRAM_EDIT_INTERVAL
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# MarkdownV2 中需要转义的字符；行内链接的 URL 部分只需转义 ")" 与 "\\"
+_MARKDOWN_V2_ESCAPE = str.maketrans({c: "\\" + c for c in "_*[]()~`>#+-=|{}.!\\"})
+_URL_ESCAPE = str.maketrans({")": "\\)", "\\": "\\\\"})
+
+# 一次扫描切出：行内链接 [文字](URL)、空行、换行、其他空白、普通词（其余单个字符）；
+# URL 中允许成对的括号（如维基百科链接）
+_TOKEN_RE = re.compile(
+    r"\[(?P<text>[^\]\n]+)\]\((?P<url>(?:[^()\s]|\([^()\s]*\))+)\)"
+    r"|(?P<para>\n{2,})|(?P<line>\n)|(?P<space>[^\S\n]+)|[^\s\[]+|\["
+)
+# 切分点优先级：空行 > 换行 > 空白；-1 表示不可在此切分
+_BREAK_GROUPS = {"para": 2, "line": 1, "space": 0}
+
+
+def utf16_len(text: str) -> int:
+    """Telegram 按 UTF-16 码元计算消息长度（emoji 等 BMP 以外的字符计 2）"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _units(text: str, markdown: bool, limit: int) -> List[Tuple[str, int, int]]:
+    """
+    把文本切成不可再分的单元 (输出片段, 可见长度, 切分优先级)。
+    markdown=True 时输出片段已按 MarkdownV2 转义，链接保留为 [文字](URL)，
+    可见长度只计链接文字；链接与转义序列不会被切开。
+    """
+    units = []
+    for match in _TOKEN_RE.finditer(text):
+        raw = match.group()
+        kind = match.lastgroup
+        if kind == "url":
+            # 链接作为整体；markdown 时只有文字部分计入长度
+            label = match.group("text")
+            width = utf16_len(label) if markdown else utf16_len(raw)
+            if width <= limit:
+                if markdown:
+                    raw = (
+                        f"[{label.translate(_MARKDOWN_V2_ESCAPE)}]"
+                        f"({match.group('url').translate(_URL_ESCAPE)})"
+                    )
+                units.append((raw, width, -1))
+                continue
+        elif kind in _BREAK_GROUPS:
+            units.append((raw, utf16_len(raw), _BREAK_GROUPS[kind]))
+            continue
+        width = utf16_len(raw)
+        pieces = [raw] if width <= limit else list(raw)
+        for piece in pieces:
+            if markdown:
+                out = piece.translate(_MARKDOWN_V2_ESCAPE)
+            else:
+                out = piece
+            units.append((out, width if len(pieces) == 1 else utf16_len(piece), -1))
+    return units
+
+
+def _chunk(units: List[Tuple[str, int, int]], limit: int) -> List[str]:
+    """
+    贪心装箱：每条消息尽量装满 limit，超出时在窗口内最靠后的最高优先级切分点处断开
+    （空行 > 换行 > 空白），没有切分点时在单元之间硬切；切分处的空白被丢弃。
+    """
+    chunks = []
+    start, n = 0, len(units)
+    while start < n:
+        while start < n and units[start][2] >= 0:
+            start += 1
+        if start >= n:
+            break
+        width = 0
+        best = [0, 0, 0]
+        end = start
+        while end < n and width + units[end][1] <= limit:
+            if units[end][2] >= 0:
+                best[units[end][2]] = end
+            width += units[end][1]
+            end += 1
+        if end == start:
+            # 单个单元就超过 limit（如 limit=1 时的 emoji）：独占一条，保证向前推进
+            end += 1
+        cut = end
+        if end < n:
+            cut = next((b for b in reversed(best) if b > start), end)
+        chunks.append("".join(unit[0] for unit in units[start:cut]).rstrip())
+        start = cut
+    return chunks or [""]
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """
+    按长度上限（UTF-16 码元）切分纯文本，优先在空行、换行、空白处切分，不切开单词与链接。
+    """
+    return _chunk(_units(text, False, limit), limit)
+
+
+def render_markdown_v2(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """
+    一次扫描把纯文本渲染为 MarkdownV2 并按长度上限切分：特殊字符全部转义，
+    [文字](URL) 保留为链接（文字与 URL 分别转义）。长度按解析后的可见文本计算
+    （Telegram 的 4096 上限针对解析后的文本），切分点与 split_message 相同。
+    """
+    return _chunk(_units(text, True, limit), limit)
+
+
+def _retry_seconds(e: RetryAfter) -> float:
+    delay = e.retry_after
+    if hasattr(delay, "total_seconds"):
+        delay = delay.total_seconds()
+    return float(delay)
+
+
+class ProgressiveMessage:
+    """
+    把不断增长的文本节流地编辑到 Telegram 消息中：两次推送至少间隔 interval 秒，
+    超过单条长度上限的部分续发为新消息。finish() 写入最终文本（可渲染为 MarkdownV2）。
+    """
+
+    def __init__(
+        self,
+        message,
+        interval: float = TELEGRAM_EDIT_INTERVAL,
+        limit: int = TELEGRAM_MESSAGE_LIMIT,
+    ):
+        self._messages = [message]
+        self._shown = [message.text or ""]
+        self._interval = interval
+        self._limit = limit
+        self._pending = None
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    def update(self, text: str):
+        """记录最新文本；需在事件循环中调用"""
+        self._pending = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self._interval)
+        text, self._pending = self._pending, None
+        if text is None:
+            return
+        try:
+            await self._render(split_message(text, self._limit), None, final=False)
+        except Exception as e:
+            # 中间进度推送失败不影响最终结果
+            logger.warning("流式更新 Telegram 消息失败：%s", e)
+
+    async def finish(self, text: str, markdown: bool = False):
+        """
+        取消未完成的进度推送并写入最终文本；markdown=True 时由 render_markdown_v2
+        转义并切分后以 MarkdownV2 发送（text 为未转义的原文）
+        """
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._pending = None
+        if markdown:
+            chunks = render_markdown_v2(text, self._limit)
+            await self._render(chunks, "MarkdownV2", final=True)
+        else:
+            await self._render(split_message(text, self._limit), None, final=True)
+
+    async def _render(self, chunks: List[str], parse_mode: Optional[str], final: bool):
+        async with self._lock:
+            for idx, chunk in enumerate(chunks):
+                if idx < len(self._messages):
+                    if chunk == self._shown[idx] and parse_mode is None:
+                        continue
+                    result = await self._call(
+                        self._messages[idx].edit_text, chunk, parse_mode, final
+                    )
+                    if result is not None:
+                        self._shown[idx] = chunk
+                else:
+                    msg = await self._call(
+                        self._messages[0].reply_text, chunk, parse_mode, final
+                    )
+                    if msg is None:
+                        return
+                    self._messages.append(msg)
+                    self._shown.append(chunk)
+            if final:
+                # 最终文本更短时删除多余的消息
+                for msg in self._messages[len(chunks) :]:
+                    try:
+                        await msg.delete()
+                    except Exception as e:
+                        logger.warning("删除多余消息失败：%s", e)
+                del self._messages[len(chunks) :]
+                del self._shown[len(chunks) :]
+
+    @staticmethod
+    async def _call(method, text: str, parse_mode: Optional[str], final: bool):
+        """调用编辑/发送方法；遇到限流时最终结果等待后重试，中间进度直接跳过"""
+        kind = "final" if final else "progress"
+        for _ in range(3):
+            try:
+                with metrics.timer("telegram_send_seconds", kind=kind):
+                    return await method(text, parse_mode=parse_mode)
+            except RetryAfter as e:
+                metrics.inc("telegram_retry_after_total", kind=kind)
+                if not final:
+                    logger.debug("Telegram 限流，跳过本次进度更新")
+                    return None
+                await asyncio.sleep(_retry_seconds(e))
+            except BadRequest as e:
+                if "not modified" in str(e).lower():
+                    return None
+                raise
+        return await method(text, parse_mode=parse_mode)
+
+
+async def send_text(bot, chat_id, text: str, markdown: bool = False):
+    """
+    向 chat_id 发送文本，超过单条长度上限时分多条发送；
+    markdown=True 时渲染为 MarkdownV2（text 为未转义的原文）
+    """
+    if markdown:
+        chunks, parse_mode = render_markdown_v2(text), "MarkdownV2"
+    else:
+        chunks, parse_mode = split_message(text), None
+    for chunk in chunks:
+        await ProgressiveMessage._call(
+            lambda t, parse_mode=None: bot.send_message(
+                chat_id, t, parse_mode=parse_mode
+            ),
+            chunk,
+            parse_mode,
+            True,
+        )
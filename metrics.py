@@ -0,0 +1,225 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from config import METRICS_ENABLED
+from logger import get_logger, report_error
+
+logger = get_logger(__name__)
+
+# 延迟直方图的桶上界（秒）
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# 指标说明（/metrics 的 HELP 行）
+_HELP = {
+    "rss_fetch_seconds": "RSSHub request + parse latency per base and status",
+    "rss_channel_failures_total": "Channel fetches where every RSSHub instance failed",
+    "rss_parse_seconds": "Feed parse latency",
+    "rss_cache_hits_total": "Channel fetches served from the feed cache without a request",
+    "truncate_seconds": "Input truncation/selection latency",
+    "truncate_items_total": "Items kept or dropped by truncation",
+    "llm_call_seconds": "LLM call latency including retries",
+    "llm_retries_total": "LLM request retries",
+    "llm_cache_hits_total": "LLM calls answered from the response cache",
+    "llm_tokens_total": "LLM tokens reported by usage",
+    "summary_cache_items_total": "Per-item summaries served from cache or generated",
+    "telegram_send_seconds": "Telegram send/edit latency",
+    "telegram_retry_after_total": "Telegram flood-control responses",
+    "digest_seconds": "End-to-end digest latency",
+}
+
+_NULL_TIMER = nullcontext()
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """按桶估计分位数（取所在桶的上界）"""
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(_BUCKETS, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    """进程内的计数器与直方图，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+
+    def inc(self, name: str, value: float, labels: dict):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: dict):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram()
+            hist.observe(value)
+
+    def total(self, name: str, **labels) -> float:
+        """计数器在所有匹配 labels 的序列上的合计"""
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(
+                value
+                for key, value in self._counters.get(name, {}).items()
+                if wanted <= set(key)
+            )
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                _header(lines, name, "counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                _header(lines, name, "histogram")
+                for key, hist in series.items():
+                    cumulative = 0
+                    for bound, n in zip(_BUCKETS, hist.counts):
+                        cumulative += n
+                        le = _labels(key + (("le", f"{bound:g}"),))
+                        lines.append(f"{name}_bucket{le} {cumulative}")
+                    le = _labels(key + (("le", "+Inf"),))
+                    lines.append(f"{name}_bucket{le} {hist.count}")
+                    lines.append(f"{name}_sum{_labels(key)} {hist.sum:g}")
+                    lines.append(f"{name}_count{_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """按指标名汇总（合并所有标签）的可读文本，用于 /stats"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                merged = _Histogram()
+                for hist in series.values():
+                    merged.count += hist.count
+                    merged.sum += hist.sum
+                    merged.counts = [a + b for a, b in zip(merged.counts, hist.counts)]
+                if not merged.count:
+                    continue
+                lines.append(
+                    f"{name}: n={merged.count} avg={merged.sum / merged.count:.3f}s"
+                    f" p50≤{merged.quantile(0.5):g}s p95≤{merged.quantile(0.95):g}s"
+                )
+            for name, series in sorted(self._counters.items()):
+                parts = [
+                    f"{','.join(v for _, v in key) or 'all'}={value:g}"
+                    for key, value in sorted(series.items())
+                ]
+                lines.append(f"{name}: {' '.join(parts)}")
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in key) + "}"
+
+
+def _header(lines: list, name: str, kind: str):
+    if name in _HELP:
+        lines.append(f"# HELP {name} {_HELP[name]}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+REGISTRY = Registry()
+
+
+def inc(name: str, value: float = 1, **labels):
+    """计数器加 value；未启用指标时直接返回"""
+    if METRICS_ENABLED:
+        REGISTRY.inc(name, value, labels)
+
+
+def observe(name: str, value: float, **labels):
+    """记录一次直方图观测值（秒）；未启用指标时直接返回"""
+    if METRICS_ENABLED:
+        REGISTRY.observe(name, value, labels)
+
+
+@contextmanager
+def _timer(name: str, labels: dict):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - started, labels)
+
+
+def timer(name: str, **labels):
+    """计时上下文管理器；未启用指标时返回共享的空上下文，开销可忽略"""
+    if not METRICS_ENABLED:
+        return _NULL_TIMER
+    return _timer(name, labels)
+
+
+def summary() -> str:
+    if not METRICS_ENABLED:
+        return "指标未启用（设置 METRICS_ENABLED=1）。"
+    return REGISTRY.summary() or "暂无指标数据。"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics: " + format, *args)
+
+
+def start_server(host: str, port: int):
+    """在后台线程中提供 /metrics；未启用指标或端口为 0 时不启动，启动失败时返回 None"""
+    if not METRICS_ENABLED or not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        # 端口被占用等：指标端点是可选功能，不影响 Bot 运行
+        logger.exception("指标服务启动失败，/metrics 不可用：%s:%s", host, port)
+        report_error(e, {"component": "metrics", "host": host, "port": port})
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info("指标服务已启动：http://%s:%s/metrics", host, port)
+    return server
@@ -0,0 +1,148 @@
+import re
+import html
+from typing import List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 整块丢弃的元素与注释
+_DROP_BLOCK_RE = re.compile(
+    r"<!--.*?-->|<(script|style|noscript)\b[^>]*>.*?</\1\s*>", re.S | re.I
+)
+# 超链接：取 href 与链接文本
+_ANCHOR_RE = re.compile(
+    r"<a\b[^>]*?\bhref\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+))[^>]*>(.*?)</a\s*>",
+    re.S | re.I,
+)
+# 换行类标签
+_BREAK_RE = re.compile(
+    r"<br\s*/?>|</?(?:p|div|li|ul|ol|blockquote|pre|tr|h[1-6])\b[^>]*>", re.I
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+_URL_RE = re.compile(r"https?://[^\s<>\"'，。、；）】]+")
+_SPACE_RE = re.compile(r"[ \t\r\f\v\xa0\u2000-\u200b\u202f\u205f\u3000\ufeff]+")
+_NEWLINES_RE = re.compile(r"\s*\n\s*")
+
+# Telegram 频道常见的结尾推广行：频道/投稿/群组等 + @用户名或 t.me 链接，分隔线，纯 @/链接 行
+_FOOTER_LINE_RE = re.compile(
+    r"^[^\w@]*(?:"
+    r"(?:频道|投稿|爆料|订阅|关注|群组|交流群|讨论群|商务|合作|广告|联系|"
+    r"channel|group|chat|subscribe|join|follow|contact|submit|via)"
+    r".{0,40}?(?:@\w{3,}|t\.me/\S+)"
+    r"|(?:(?:@\w{3,}|(?:https?://)?t\.me/\S+)[\s|｜/,，]*)+"
+    r"|[-—_=*·•~|]{3,}"
+    r")[^\w]*$",
+    re.I,
+)
+# 最多从结尾移除的行数，避免误删正文
+_MAX_FOOTER_LINES = 6
+
+# 追踪参数（查询字符串中删除）
+_TRACKING_PARAMS = frozenset(
+    (
+        "fbclid",
+        "gclid",
+        "dclid",
+        "yclid",
+        "msclkid",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "ref_src",
+        "ref_url",
+        "spm",
+        "share_source",
+        "share_medium",
+        "vd_source",
+        "si",
+    )
+)
+
+
+def clean_url(url: str) -> str:
+    """删除 utm_* 等追踪参数"""
+    url = url.strip()
+    if "?" not in url:
+        return url
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    query = [
+        (k, v)
+        for k, v in params
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    ]
+    if len(query) == len(params):
+        return url
+    return urlunsplit(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def _strip_footer(lines: List[str]) -> List[str]:
+    end = len(lines)
+    while end > 1 and len(lines) - end < _MAX_FOOTER_LINES:
+        if not _FOOTER_LINE_RE.match(lines[end - 1]):
+            break
+        end -= 1
+    return lines[:end]
+
+
+def html_to_text(raw: str) -> Tuple[str, List[str]]:
+    """
+    把 feed 摘要 HTML 转为纯文本，返回 (文本, 链接列表)。
+
+    去掉标签、图片与脚本，解码实体，合并空白，去掉结尾的频道推广行；
+    超链接单独提取（去重、去追踪参数），链接文本本身就是 URL 时不保留在正文中。
+    """
+    if not raw:
+        return "", []
+    links = []
+
+    def add_link(url: str):
+        url = clean_url(html.unescape(url))
+        if url.startswith(("http://", "https://")) and url not in links:
+            links.append(url)
+        return url
+
+    def anchor(match) -> str:
+        href = match.group(1) or match.group(2) or match.group(3) or ""
+        url = add_link(href)
+        text = _TAG_RE.sub("", match.group(4))
+        plain = html.unescape(text).strip()
+        if not plain or plain == url or plain.startswith(("http://", "https://")):
+            return " "
+        return text
+
+    text = _DROP_BLOCK_RE.sub("", raw)
+    text = _ANCHOR_RE.sub(anchor, text)
+    text = _BREAK_RE.sub("\n", text)
+    text = _TAG_RE.sub("", text)
+    text = html.unescape(text)
+    # 正文中的裸链接：去掉追踪参数，同样记入链接列表
+    text = _URL_RE.sub(lambda m: add_link(m.group(0)), text)
+    text = _SPACE_RE.sub(" ", text)
+    lines = [line for line in _NEWLINES_RE.split(text.strip()) if line]
+    return "\n".join(_strip_footer(lines)), links
+
+
+def clean_title(title: str) -> str:
+    """标题：解码实体并合并空白"""
+    if not title:
+        return ""
+    return _SPACE_RE.sub(" ", html.unescape(_TAG_RE.sub("", title))).strip()
+
+
+# normalize_entry 返回的字段顺序
+ENTRY_FIELDS = ("title", "content", "links", "link", "id", "published")
+
+
+def normalize_entry(entry) -> tuple:
+    """feed 条目 -> ENTRY_FIELDS 顺序的元组（跨进程传递时比字典更紧凑）"""
+    content, links = html_to_text(entry.get("summary", ""))
+    return (
+        clean_title(entry.get("title", "")),
+        content,
+        links,
+        entry.get("link", ""),
+        entry.get("id", ""),
+        entry.get("published", ""),
+    )
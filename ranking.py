@@ -0,0 +1,110 @@
+import math
+import heapq
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# 无法解析发布时间时的时效分（相当于一个半衰期之前）
+_UNKNOWN_RECENCY = 0.5
+# 内容达到该 token 数即视为信息完整，更短的条目按比例降权
+_FULL_LENGTH_TOKENS = 80
+
+
+def parse_channel_weights(spec: str) -> Dict[str, float]:
+    """解析 "channel:weight,channel:weight" 形式的频道权重"""
+    weights = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        channel, _, value = part.rpartition(":")
+        try:
+            weights[channel.strip()] = float(value)
+        except ValueError:
+            logger.warning("无效的频道权重：%s（应为 channel:weight）", part)
+    return weights
+
+
+def published_timestamp(value: str) -> Optional[float]:
+    """解析 RSS pubDate（RFC 822）或 Atom（ISO 8601）时间，失败返回 None"""
+    if not value:
+        return None
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def score_item(
+    item: dict,
+    tokens: int,
+    now: float,
+    half_life_hours: float,
+    weights: Dict[str, float],
+) -> float:
+    """
+    条目重要度 = 频道权重 × 时效 × 覆盖度 × 长度。
+
+    时效按发布时间指数衰减（half_life_hours 减半）；覆盖度随报道该事件的频道数
+    （近重复合并后的 sources）对数增长；过短的条目信息量不足，按长度降权。
+    """
+    sources = item.get("sources") or [{"source": item.get("source", "")}]
+    weight = max(weights.get(s.get("source", ""), 1.0) for s in sources)
+    published = published_timestamp(item.get("published", ""))
+    if published is None or half_life_hours <= 0:
+        recency = _UNKNOWN_RECENCY
+    else:
+        age_hours = max(0.0, now - published) / 3600
+        recency = 0.5 ** (age_hours / half_life_hours)
+    coverage = 1 + math.log2(len(sources))
+    length = math.sqrt(min(1.0, tokens / _FULL_LENGTH_TOKENS))
+    return weight * recency * coverage * length
+
+
+def select_items(
+    items: List[dict],
+    costs: List[int],
+    overheads: List[int],
+    budget: int,
+    scores: List[float],
+    trim: Callable[[int, int], dict],
+    min_keep_ratio: float = 0.5,
+) -> List[dict]:
+    """
+    按重要度贪心填充 token 预算：高分条目整条保留，放不下时允许裁剪到不少于
+    原长度的 min_keep_ratio，否则跳过并尝试后面的条目。结果保持原始顺序。
+
+    costs 为各条内容的 token 数，overheads 为各条格式开销；trim(i, keep) 返回
+    内容裁剪到 keep 个 token 的条目副本。用大小为 k 的堆取前 k 名，O(n log k)，
+    k 为预算最多能容纳的条目数。
+    """
+    min_cost = min(
+        o + max(1, int(c * min_keep_ratio)) for o, c in zip(overheads, costs)
+    )
+    k = min(len(items), max(1, budget // max(min_cost, 1)))
+    ranked = heapq.nlargest(k, range(len(items)), key=scores.__getitem__)
+
+    chosen = {}
+    remaining = budget
+    for i in ranked:
+        if remaining < min_cost:
+            break
+        cost = overheads[i] + costs[i]
+        if cost <= remaining:
+            chosen[i] = items[i]
+            remaining -= cost
+            continue
+        keep = remaining - overheads[i]
+        if keep > 0 and keep >= costs[i] * min_keep_ratio:
+            chosen[i] = trim(i, keep)
+            remaining -= overheads[i] + keep
+    return [chosen[i] for i in sorted(chosen)]
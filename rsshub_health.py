@@ -0,0 +1,236 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from typing import List, Optional
+from logger import get_logger, report_error
+
+logger = get_logger(__name__)
+
+# 没有历史数据的实例视为的成功率（略低于 1，已验证可用的实例优先）
+_PRIOR_SUCCESS_RATE = 0.8
+
+
+class _InstanceStats:
+    def __init__(self, window: int):
+        self.results = deque(maxlen=window)  # 1 = 成功，0 = 失败
+        self.latency_ewma = None  # 秒
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # 熔断打开直到该时间（wall clock）
+        self.cooldown_until = 0.0  # 429 冷却直到该时间
+        self.probe_until = 0.0  # 半开试探进行中，直到该时间（不持久化）
+
+    @property
+    def success_rate(self) -> float:
+        if not self.results:
+            return _PRIOR_SUCCESS_RATE
+        return sum(self.results) / len(self.results)
+
+    def available(self, now: float) -> bool:
+        return (
+            now >= self.open_until
+            and now >= self.cooldown_until
+            and now >= self.probe_until
+        )
+
+    def score(self) -> float:
+        latency = self.latency_ewma if self.latency_ewma is not None else 1.0
+        return self.success_rate / (1.0 + latency)
+
+    def to_dict(self) -> dict:
+        return {
+            "results": list(self.results),
+            "latency_ewma": self.latency_ewma,
+            "consecutive_failures": self.consecutive_failures,
+            "open_until": self.open_until,
+            "cooldown_until": self.cooldown_until,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, window: int) -> "_InstanceStats":
+        stats = cls(window)
+        stats.results.extend(int(x) for x in data.get("results", []))
+        stats.latency_ewma = data.get("latency_ewma")
+        stats.consecutive_failures = int(data.get("consecutive_failures", 0))
+        stats.open_until = float(data.get("open_until", 0.0))
+        stats.cooldown_until = float(data.get("cooldown_until", 0.0))
+        return stats
+
+
+class HealthTracker:
+    """
+    RSSHub 实例健康度跟踪。
+
+    - 滚动成功率（最近 window 次）与延迟 EWMA 组成得分
+    - 429 按 Retry-After（或默认时长）冷却
+    - 连续失败达到阈值后熔断一段时间；到期后半开，只放行一次试探，
+      试探成功（record_success）关闭熔断，失败（record_failure）重新熔断；
+      试探在 probe_seconds 内没有结果（如 404 不计入健康度）时可再放行一次
+    - 记录每个频道最近成功的实例，下次优先使用
+    状态保存在磁盘上，重启后无需重新学习。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        window: int = 20,
+        alpha: float = 0.3,
+        failure_threshold: int = 5,
+        open_seconds: float = 300,
+        cooldown_seconds: float = 60,
+        probe_seconds: float = 60,
+    ):
+        self.path = path
+        self.window = window
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.probe_seconds = probe_seconds
+        self._lock = threading.Lock()
+        self._instances = {}
+        self._routes = {}  # channel_id -> base
+        self._loaded = False
+        self._dirty = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._instances = {
+                base: _InstanceStats.from_dict(stats, self.window)
+                for base, stats in data.get("instances", {}).items()
+            }
+            self._routes = dict(data.get("routes", {}))
+        except Exception as e:
+            logger.exception("加载 RSSHub 健康状态失败：%s", self.path)
+            report_error(e, {"file": self.path})
+
+    def _stats(self, base: str) -> _InstanceStats:
+        stats = self._instances.get(base)
+        if stats is None:
+            stats = self._instances[base] = _InstanceStats(self.window)
+        return stats
+
+    def order(
+        self,
+        bases: List[str],
+        channel_id: Optional[str] = None,
+        preferred: Optional[str] = None,
+    ) -> List[str]:
+        """
+        按健康度排序实例：可用实例按得分降序（同分保持配置顺序），
+        指定的 preferred（否则为该频道上次成功的实例）排在最前；
+        冷却/熔断中的实例排在最后，仅作兜底。
+        熔断到期（半开）的实例只在一次排序中作为可用实例返回，由这次抓取试探。
+        """
+        now = time.time()
+        with self._lock:
+            self._load()
+            if preferred is None and channel_id:
+                preferred = self._routes.get(channel_id)
+            available = []
+            unavailable = []
+            for idx, base in enumerate(bases):
+                stats = self._stats(base)
+                if stats.available(now):
+                    if stats.consecutive_failures >= self.failure_threshold:
+                        # 半开：占用试探名额，结果出来之前其他抓取不再放行
+                        stats.probe_until = now + self.probe_seconds
+                    available.append((-stats.score(), idx, base))
+                else:
+                    until = max(
+                        stats.open_until, stats.cooldown_until, stats.probe_until
+                    )
+                    unavailable.append((until, idx, base))
+        ordered = [base for _, _, base in sorted(available)]
+        if preferred in ordered:
+            ordered.remove(preferred)
+            ordered.insert(0, preferred)
+        return ordered + [base for _, _, base in sorted(unavailable)]
+
+    def record_success(self, base: str, latency: float, channel_id: Optional[str] = None):
+        with self._lock:
+            self._load()
+            stats = self._stats(base)
+            stats.results.append(1)
+            if stats.latency_ewma is None:
+                stats.latency_ewma = latency
+            else:
+                stats.latency_ewma = (
+                    self.alpha * latency + (1 - self.alpha) * stats.latency_ewma
+                )
+            stats.consecutive_failures = 0
+            stats.open_until = 0.0
+            stats.probe_until = 0.0
+            if channel_id:
+                self._routes[channel_id] = base
+            self._dirty = True
+
+    def record_failure(
+        self,
+        base: str,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
+        now = time.time()
+        with self._lock:
+            self._load()
+            stats = self._stats(base)
+            stats.results.append(0)
+            stats.consecutive_failures += 1
+            if status == 429:
+                wait = retry_after if retry_after is not None else self.cooldown_seconds
+                stats.cooldown_until = now + wait
+                logger.warning("RSSHub 实例 %s 限流，冷却 %.0fs", base, wait)
+            if stats.consecutive_failures >= self.failure_threshold:
+                stats.open_until = now + self.open_seconds
+                stats.probe_until = 0.0
+                logger.warning(
+                    "RSSHub 实例 %s 连续失败 %d 次，熔断 %.0fs",
+                    base,
+                    stats.consecutive_failures,
+                    self.open_seconds,
+                )
+            self._dirty = True
+
+    def snapshot(self) -> dict:
+        """返回各实例当前状态（用于日志/诊断）"""
+        now = time.time()
+        with self._lock:
+            self._load()
+            return {
+                base: {
+                    "success_rate": round(stats.success_rate, 3),
+                    "latency_ewma": stats.latency_ewma,
+                    "available": stats.available(now),
+                    "score": round(stats.score(), 4),
+                }
+                for base, stats in self._instances.items()
+            }
+
+    def save(self):
+        """原子写入磁盘（临时文件 + rename），仅在有变更时写入"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "instances": {b: s.to_dict() for b, s in self._instances.items()},
+                "routes": self._routes,
+            }
+            tmp_path = f"{self.path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                logger.exception("保存 RSSHub 健康状态失败：%s", self.path)
+                report_error(e, {"file": self.path})
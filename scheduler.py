@@ -0,0 +1,180 @@
+import time
+import asyncio
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from logger import get_logger, report_error
+
+try:
+    from zoneinfo import ZoneInfo
+except Exception:
+    ZoneInfo = None
+
+logger = get_logger(__name__)
+
+
+def parse_push_times(spec: str) -> List[Tuple[int, int]]:
+    """解析 "HH:MM,HH:MM" 形式的每日推送时间"""
+    times = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            hour, minute = part.split(":")
+            hour, minute = int(hour), int(minute)
+        except ValueError:
+            logger.warning("无效的推送时间：%s（应为 HH:MM）", part)
+            continue
+        if 0 <= hour < 24 and 0 <= minute < 60:
+            times.append((hour, minute))
+        else:
+            logger.warning("无效的推送时间：%s（应为 HH:MM）", part)
+    return sorted(set(times))
+
+
+class DigestScheduler:
+    """
+    后台预计算简报：每隔 refresh_interval 秒增量刷新订阅并为每个接收者重新生成简报
+    （保持“热”结果），在每日 push_times 推送给所有接收者。
+    /digest 可通过 fresh(chat_id) 直接使用足够新的热结果。
+
+    build() 返回 {chat_id: (报告, 参与分析的条目)}（订阅相同的接收者共享同一份结果）；
+    deliver(chat_id, report) 负责发送；mark_seen(chat_id, items) 在简报真正送达后
+    记录已读（预计算本身不记录）。
+    """
+
+    def __init__(
+        self,
+        build: Callable[[], Awaitable[Dict[str, Tuple[str, List[dict]]]]],
+        deliver: Callable[[str, str], Awaitable[None]],
+        mark_seen: Callable[[str, List[dict]], Awaitable[None]],
+        is_error: Callable[[str], bool],
+        refresh_interval: float,
+        push_times: List[Tuple[int, int]],
+        max_age: float,
+        timezone: str = "",
+    ):
+        self._build = build
+        self._deliver = deliver
+        self._mark_seen = mark_seen
+        self._is_error = is_error
+        self.refresh_interval = refresh_interval
+        self.push_times = push_times
+        self.max_age = max_age
+        self._tz = None
+        if timezone:
+            if ZoneInfo is None:
+                logger.warning("当前 Python 不支持 zoneinfo，推送时间按服务器本地时区计算")
+            else:
+                self._tz = ZoneInfo(timezone)
+        self._warm = {}  # chat_id -> (report, items, created_at)
+        self._last_refresh = 0.0
+        self._task = None
+        self._refresh_lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.refresh_interval > 0 or bool(self.push_times)
+
+    def fresh(self, chat_id: str) -> Optional[Tuple[str, List[dict], float]]:
+        """返回 chat_id 不超过 max_age 秒的热简报 (report, items, created_at)，否则 None"""
+        warm = self._warm.get(str(chat_id))
+        if warm is None or time.time() - warm[2] > self.max_age:
+            return None
+        return warm
+
+    def _next_push(self, after: float) -> Optional[float]:
+        """返回晚于 after 的下一个推送时间（epoch 秒）"""
+        if not self.push_times:
+            return None
+        now = datetime.fromtimestamp(after, self._tz)
+        for day in range(2):
+            date = now.date() + timedelta(days=day)
+            for hour, minute in self.push_times:
+                slot = datetime(
+                    date.year, date.month, date.day, hour, minute, tzinfo=self._tz
+                )
+                ts = slot.timestamp()
+                if ts > after:
+                    return ts
+        return None
+
+    async def refresh(self):
+        """重新抓取（走 feed 缓存与条件请求）并生成热简报"""
+        async with self._refresh_lock:
+            self._last_refresh = time.time()
+            results = await self._build()
+            now = time.time()
+            for chat_id, (report, items) in results.items():
+                if items and not self._is_error(report):
+                    self._warm[str(chat_id)] = (report, items, now)
+                else:
+                    logger.info("后台简报未更新：chat=%s %s", chat_id, report)
+            # 不再是接收者的用户不再保留结果
+            for chat_id in set(self._warm) - {str(c) for c in results}:
+                del self._warm[chat_id]
+            logger.info(
+                "后台简报已更新：%d/%d 个接收者", len(self._warm), len(results)
+            )
+
+    async def push(self):
+        if not self._warm or any(self.fresh(c) is None for c in self._warm):
+            await self.refresh()
+        pushed = 0
+        for chat_id in list(self._warm):
+            warm = self.fresh(chat_id)
+            if warm is None:
+                logger.warning("定时推送跳过：chat=%s 没有可用的简报", chat_id)
+                continue
+            report, items, _ = warm
+            # 单个接收者发送失败不影响其他人
+            try:
+                await self._deliver(chat_id, report)
+            except Exception as e:
+                logger.exception("定时简报推送失败：chat=%s", chat_id)
+                report_error(e, {"component": "scheduler", "chat_id": chat_id})
+                continue
+            await self._mark_seen(chat_id, items)
+            pushed += 1
+        logger.info("定时简报已推送：%d 个接收者", pushed)
+
+    async def run(self):
+        while True:
+            now = time.time()
+            next_push = self._next_push(now)
+            next_refresh = None
+            if self.refresh_interval > 0:
+                next_refresh = self._last_refresh + self.refresh_interval
+            wake = min(t for t in (next_push, next_refresh) if t is not None)
+            await asyncio.sleep(max(0.0, wake - time.time()))
+            try:
+                if next_push is not None and time.time() >= next_push:
+                    await self.push()
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("后台简报任务失败：%s", e)
+                report_error(e, {"component": "scheduler"})
+                # 避免失败时立即重试
+                self._last_refresh = time.time()
+
+    def start(self):
+        """在当前事件循环中启动后台任务"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+            logger.info(
+                "后台简报已启动：刷新间隔=%ss 推送时间=%s",
+                self.refresh_interval,
+                ",".join(f"{h:02d}:{m:02d}" for h, m in self.push_times) or "-",
+            )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
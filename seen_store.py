@@ -0,0 +1,102 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import List
+from logger import get_logger, report_error
+
+logger = get_logger(__name__)
+
+
+def item_key(item: dict) -> str:
+    """条目的稳定标识：优先 RSS guid/id，其次链接，最后用标题+内容的哈希"""
+    key = item.get("id") or item.get("link")
+    if key:
+        return str(key)
+    raw = f"{item.get('title', '')}\n{item.get('content', '')}"
+    return "sha1:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _channel(item: dict, scope: str) -> str:
+    """记录所属的频道列：其他用户的记录以 "<scope>/" 为前缀，与主用户互不影响"""
+    source = str(item.get("source", ""))
+    return f"{scope}/{source}" if scope else source
+
+
+class SeenStore:
+    """
+    已进入过简报的条目记录（SQLite），按频道保存条目标识。
+
+    用于增量简报：只把上次简报之后出现的新条目发送给 LLM。
+    scope 区分不同的接收者（空字符串为主用户），各自记录已读。
+    超过 retention_days 的记录会被清理。
+    """
+
+    def __init__(self, path: str, retention_days: int = 30):
+        self.path = path
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                " channel TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " seen_at REAL NOT NULL,"
+                " PRIMARY KEY (channel, key)"
+                ") WITHOUT ROWID"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def filter_new(self, items: List[dict], scope: str = "") -> List[dict]:
+        """返回尚未出现在任何历史简报中的条目（保持原顺序）"""
+        if not items:
+            return []
+        channels = {_channel(it, scope) for it in items}
+        try:
+            with self._lock:
+                conn = self._connect()
+                seen = {}
+                for channel in channels:
+                    rows = conn.execute(
+                        "SELECT key FROM seen WHERE channel = ?", (channel,)
+                    )
+                    seen[channel] = {row[0] for row in rows}
+        except Exception as e:
+            logger.exception("读取已读记录失败：%s", self.path)
+            report_error(e, {"file": self.path})
+            return list(items)
+        return [
+            it
+            for it in items
+            if item_key(it) not in seen.get(_channel(it, scope), ())
+        ]
+
+    def mark_seen(self, items: List[dict], scope: str = ""):
+        """记录条目已进入简报，并清理过期记录"""
+        if not items:
+            return
+        now = time.time()
+        rows = [(_channel(it, scope), item_key(it), now) for it in items]
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO seen (channel, key, seen_at) VALUES (?, ?, ?)",
+                    rows,
+                )
+                conn.execute(
+                    "DELETE FROM seen WHERE seen_at < ?",
+                    (now - self.retention_days * 86400,),
+                )
+                conn.commit()
+        except Exception as e:
+            logger.exception("写入已读记录失败：%s", self.path)
+            report_error(e, {"file": self.path})
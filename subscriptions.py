@@ -0,0 +1,177 @@
+import os
+import json
+import threading
+from typing import Dict, Iterable, List, Tuple
+from logger import get_logger, report_error
+
+logger = get_logger(__name__)
+
+# 支持的频道元数据：权重（重要度排序）、抓取条数、首选 RSSHub 实例
+META_KEYS = ("weight", "limit", "base")
+
+
+def _parse_meta(raw: dict) -> dict:
+    meta = {}
+    if raw.get("weight") is not None:
+        meta["weight"] = float(raw["weight"])
+    if raw.get("limit") is not None:
+        meta["limit"] = int(raw["limit"])
+    if raw.get("base"):
+        meta["base"] = str(raw["base"]).rstrip("/")
+    return meta
+
+
+class SubscriptionRegistry:
+    """
+    内存中的订阅表：有序、O(1) 成员判断，每个频道可带元数据（weight / limit / base）。
+
+    文件只在首次使用和 mtime 变化（外部编辑）时重新加载；写入为临时文件 + rename 的原子替换，
+    批量增删只写一次。文件格式兼容旧版纯字符串列表：没有元数据的频道仍保存为字符串，
+    有元数据的保存为 {"id": ..., "weight": ..., "limit": ..., "base": ...}。
+    """
+
+    def __init__(self, path: str, defaults: Iterable[str] = ()):
+        self.path = path
+        self.defaults = list(defaults)
+        self._lock = threading.RLock()
+        self._channels: Dict[str, dict] = {}
+        self._stamp = None
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self):
+        """文件不存在时用默认频道初始化；mtime 变化时重新加载"""
+        stamp = self._file_stamp()
+        if stamp is None:
+            if self._stamp is None and not self._channels:
+                self._channels = {ch: {} for ch in self.defaults}
+                self._save()
+            return
+        if stamp == self._stamp:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            channels = {}
+            for entry in data:
+                if isinstance(entry, dict):
+                    channel_id = str(entry.get("id", "")).strip()
+                    meta = _parse_meta(entry)
+                else:
+                    channel_id = str(entry).strip()
+                    meta = {}
+                if channel_id:
+                    channels[channel_id] = meta
+        except Exception as e:
+            # 保留内存中的上一版本，避免编辑中的半截文件清空订阅
+            logger.exception("加载订阅文件失败：%s", self.path)
+            report_error(e, {"file": self.path})
+            self._stamp = stamp
+            return
+        self._channels = channels
+        self._stamp = stamp
+        logger.info("已加载订阅：%d 个频道", len(channels))
+
+    def _save(self):
+        data = [
+            {"id": ch, **meta} if meta else ch for ch, meta in self._channels.items()
+        ]
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self._stamp = self._file_stamp()
+        except Exception as e:
+            logger.exception("保存订阅文件失败：%s", self.path)
+            report_error(e, {"file": self.path, "channels": list(self._channels)})
+
+    def channels(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._channels)
+
+    def entries(self) -> List[Tuple[str, dict]]:
+        """按顺序返回 (channel_id, 元数据副本)"""
+        with self._lock:
+            self._refresh()
+            return [(ch, dict(meta)) for ch, meta in self._channels.items()]
+
+    def __contains__(self, channel_id: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return channel_id in self._channels
+
+    def meta(self, channel_id: str) -> dict:
+        """频道元数据（未订阅或没有元数据时为空字典）"""
+        with self._lock:
+            self._refresh()
+            return dict(self._channels.get(channel_id) or {})
+
+    def weights(self) -> Dict[str, float]:
+        with self._lock:
+            self._refresh()
+            return {
+                ch: meta["weight"]
+                for ch, meta in self._channels.items()
+                if "weight" in meta
+            }
+
+    def add(self, channel_ids: Iterable[str], **meta) -> List[str]:
+        """批量添加（保持顺序，忽略已存在的），返回实际新增的频道"""
+        meta = _parse_meta(meta)
+        with self._lock:
+            self._refresh()
+            added = []
+            for channel_id in channel_ids:
+                channel_id = str(channel_id).strip()
+                if channel_id and channel_id not in self._channels:
+                    self._channels[channel_id] = dict(meta)
+                    added.append(channel_id)
+            if added:
+                self._save()
+            return added
+
+    def remove(self, channel_ids: Iterable[str]) -> List[str]:
+        """批量移除，返回实际移除的频道"""
+        with self._lock:
+            self._refresh()
+            removed = []
+            for channel_id in channel_ids:
+                channel_id = str(channel_id).strip()
+                if self._channels.pop(channel_id, None) is not None:
+                    removed.append(channel_id)
+            if removed:
+                self._save()
+            return removed
+
+    def set_meta(self, channel_id: str, **meta) -> bool:
+        """更新频道元数据（值为 None 的键被删除）；频道不存在返回 False"""
+        with self._lock:
+            self._refresh()
+            current = self._channels.get(channel_id)
+            if current is None:
+                return False
+            for key in META_KEYS:
+                if key in meta and meta[key] is None:
+                    current.pop(key, None)
+            current.update(_parse_meta(meta))
+            self._save()
+            return True
+
+    def replace(self, channel_ids: Iterable[str]):
+        """整体替换订阅列表（保留仍在列表中的频道的元数据）"""
+        with self._lock:
+            self._refresh()
+            self._channels = {
+                ch: self._channels.get(ch, {})
+                for ch in (str(c).strip() for c in channel_ids)
+                if ch
+            }
+            self._save()
@@ -0,0 +1,98 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Iterable
+from logger import get_logger, report_error
+
+logger = get_logger(__name__)
+
+
+def summary_key(model: str, title: str, content: str) -> str:
+    """条目摘要的缓存 key：模型 + 标题 + 内容的哈希（内容变化即重新摘要）"""
+    raw = f"{model}\n{title}\n{content}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    条目级摘要缓存（SQLite），以内容哈希为 key。
+
+    每条（或近重复合并后的每个事件）只摘要一次，之后的简报直接复用；
+    超过 retention_days 未被使用的摘要会被清理。
+    """
+
+    def __init__(self, path: str, retention_days: int = 7):
+        self.path = path
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                " key TEXT PRIMARY KEY,"
+                " summary TEXT NOT NULL,"
+                " used_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """返回已缓存的摘要，并刷新其最近使用时间"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        found = {}
+        try:
+            with self._lock:
+                conn = self._connect()
+                # 分块查询，避免超出 SQLite 参数个数上限
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start : start + 500]
+                    rows = conn.execute(
+                        "SELECT key, summary FROM summaries WHERE key IN"
+                        f" ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                    found.update(rows)
+                if found:
+                    now = time.time()
+                    conn.executemany(
+                        "UPDATE summaries SET used_at = ? WHERE key = ?",
+                        [(now, key) for key in found],
+                    )
+                    conn.commit()
+        except Exception as e:
+            logger.exception("读取摘要缓存失败：%s", self.path)
+            report_error(e, {"file": self.path})
+            return {}
+        return found
+
+    def put_many(self, summaries: Dict[str, str]):
+        """写入摘要，并清理过期记录"""
+        if not summaries:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO summaries (key, summary, used_at)"
+                    " VALUES (?, ?, ?)",
+                    [(key, text, now) for key, text in summaries.items()],
+                )
+                conn.execute(
+                    "DELETE FROM summaries WHERE used_at < ?",
+                    (now - self.retention_days * 86400,),
+                )
+                conn.commit()
+        except Exception as e:
+            logger.exception("写入摘要缓存失败：%s", self.path)
+            report_error(e, {"file": self.path})
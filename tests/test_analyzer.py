@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import _covered_items, _item_sources  # noqa: E402
+from dedup import _merge  # noqa: E402
+
+
+def _stamped(item: dict) -> dict:
+    return {**item, "sources": _item_sources(item)}
+
+
+def test_linkless_items_of_one_channel_do_not_collide():
+    a = {"source": "c", "link": "", "title": "", "content": "甲"}
+    b = {"source": "c", "link": "", "title": "", "content": "乙"}
+    assert _covered_items([a, b], [_stamped(a)]) == [a]
+
+
+def test_rewritten_content_keeps_original_identity():
+    a = {"source": "c", "link": "", "title": "", "content": "原文" * 50}
+    trimmed = dict(_stamped(a), content="摘要")
+    assert _covered_items([a], [trimmed]) == [a]
+
+
+def test_merged_item_covers_every_member():
+    a = {"source": "c1", "link": "https://t.me/c1/1", "content": "同一条新闻"}
+    b = {"source": "c2", "link": "", "content": "同一条新闻，转发"}
+    c = {"source": "c2", "link": "", "content": "另一条"}
+    merged = _merge([_stamped(a), _stamped(b)])
+    assert _covered_items([a, b, c], [merged]) == [a, b]
@@ -0,0 +1,72 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import cpu_backend  # noqa: E402
+from fetcher import _read_feed_body  # noqa: E402
+
+_URL = "http://rsshub.test/telegram/channel/test"
+
+
+def _item(i: int) -> bytes:
+    return (
+        f"<item><title>t{i}</title><link>https://t.me/test/{i}</link>"
+        f"<description>d{i}</description></item>"
+    ).encode()
+
+
+def _read(chunks, limit):
+    """按给定的分块返回响应体，调用 _read_feed_body"""
+
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    async def run():
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=body())
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream("GET", _URL) as resp:
+                return await _read_feed_body(resp, _URL, limit)
+
+    return asyncio.run(run())
+
+
+def _feed(items) -> bytes:
+    return b'<?xml version="1.0"?><rss version="2.0"><channel><title>c</title>' + (
+        b"".join(items) + b"</channel></rss>"
+    )
+
+
+def test_tag_ending_at_chunk_boundary_is_counted_once():
+    data = _feed([_item(0), _item(1), _item(2)])
+    # 第一块恰好以 </item> 结尾：下一块拼上的末尾不能再计一次
+    cut = data.index(b"</item>") + len(b"</item>")
+    chunks = [data[:cut], data[cut : cut + 10], data[cut + 10 :]]
+    body, truncated = _read(chunks, limit=2)
+    rows, _, complete, _ = cpu_backend.parse_feed_rows(body, 2, 10000, truncated, True)
+    assert len(rows) == 2
+    assert not complete
+
+
+def test_tag_split_across_chunks_is_counted():
+    data = _feed([_item(0), _item(1), _item(2)])
+    cut = data.index(b"</item>") + 3
+    body, truncated = _read([data[:cut], data[cut:]], limit=1)
+    assert truncated
+    assert len(body) == len(data)
+
+
+def test_tiny_chunks_count_every_tag():
+    data = _feed([_item(i) for i in range(5)])
+    chunks = [data[i : i + 3] for i in range(0, len(data), 3)]
+    body, truncated = _read(chunks, limit=10)
+    assert not truncated
+    assert body == data
+    body, truncated = _read(chunks, limit=5)
+    assert truncated
+    assert body.count(b"</item>") == 5
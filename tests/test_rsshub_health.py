@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rsshub_health import HealthTracker  # noqa: E402
+
+
+def _tripped(tmp_path) -> HealthTracker:
+    health = HealthTracker(
+        str(tmp_path / "health.json"),
+        failure_threshold=2,
+        open_seconds=0.01,
+        probe_seconds=60,
+    )
+    health.record_failure("http://b")
+    health.record_failure("http://b")
+    time.sleep(0.02)
+    return health
+
+
+def _available(health: HealthTracker) -> bool:
+    return health.snapshot()["http://b"]["available"]
+
+
+def test_half_open_lets_a_single_probe_through(tmp_path):
+    health = _tripped(tmp_path)
+    assert _available(health)
+    health.order(["http://b"])
+    # 试探结果出来之前，其他抓取不再把该实例当作可用
+    assert not _available(health)
+
+
+def test_probe_result_closes_or_reopens_the_breaker(tmp_path):
+    health = _tripped(tmp_path)
+    health.order(["http://b"])
+    health.record_success("http://b", 0.1)
+    assert _available(health)
+
+    health = _tripped(tmp_path)
+    health.order(["http://b"])
+    health.record_failure("http://b")
+    assert not _available(health)
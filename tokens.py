@@ -0,0 +1,90 @@
+import re
+from functools import lru_cache
+from logger import get_logger
+from config import (
+    TOKENIZER,
+    TOKENIZER_ENCODING,
+    TOKEN_CJK_PER_CHAR,
+    TOKEN_ASCII_PER_CHAR,
+    TOKEN_OTHER_PER_CHAR,
+)
+
+try:
+    import tiktoken
+except Exception:
+    tiktoken = None
+
+logger = get_logger(__name__)
+
+# 中日韩文字、假名、韩文、全角符号与中文标点：每个字符大致对应 1 个 token
+_CJK_RE = re.compile(
+    "[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff"
+    "\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]"
+)
+
+
+def _load_encoding():
+    if TOKENIZER != "tiktoken":
+        return None
+    if tiktoken is None:
+        logger.warning("TOKENIZER=tiktoken 但未安装 tiktoken，改用估算")
+        return None
+    try:
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        # 离线环境下编码文件可能无法下载
+        logger.warning("加载 tiktoken 编码 %s 失败，改用估算：%s", TOKENIZER_ENCODING, e)
+        return None
+
+
+_ENCODING = _load_encoding()
+
+
+def _char_cost(ch: str) -> float:
+    if ch < "\x80":
+        return TOKEN_ASCII_PER_CHAR
+    if _CJK_RE.match(ch):
+        return TOKEN_CJK_PER_CHAR
+    return TOKEN_OTHER_PER_CHAR
+
+
+def estimate_tokens(text: str) -> int:
+    """离线估算 token 数：中日韩字符、ASCII 字符与其他字符分别按校准系数计算"""
+    if not text:
+        return 0
+    total = len(text)
+    ascii_count = len(text.encode("ascii", "ignore"))
+    cjk_count = _CJK_RE.subn("", text)[1]
+    other = total - ascii_count - cjk_count
+    return int(
+        cjk_count * TOKEN_CJK_PER_CHAR
+        + ascii_count * TOKEN_ASCII_PER_CHAR
+        + other * TOKEN_OTHER_PER_CHAR
+    ) + 1
+
+
+@lru_cache(maxsize=16384)
+def count_tokens(text: str) -> int:
+    """返回 text 的 token 数；TOKENIZER=tiktoken 时精确计算，否则估算。结果按文本缓存"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """截断 text 使其不超过 max_tokens 个 token"""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _ENCODING is not None:
+        ids = _ENCODING.encode(text, disallowed_special=())[:max_tokens]
+        return _ENCODING.decode(ids)
+    used = 1.0
+    for i, ch in enumerate(text):
+        used += _char_cost(ch)
+        if used > max_tokens:
+            return text[:i]
+    return text